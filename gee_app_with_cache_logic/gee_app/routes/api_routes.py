@@ -17,7 +17,7 @@ from gee_app.services.gee_specialized import (
     land_cover_analysis, drought_analysis_vegetation, drought_analysis_precipitation
 )
 from gee_app.utils.sensor_utils import parse_region
-from gee_app.utils.gee_utils import validate_gee_asset
+from gee_app.utils.gee_utils import validate_gee_asset, validate_gee_assets
 from gee_app.utils.ee_utils import fetch_image_metadata, get_task_progress
 from gee_app.utils.drive_utils import retrieve_image, list_images, retrieve_image, update_image, delete_image, create_folder, update_folder, delete_folder, list_folders_and_files, get_available_drive_storage
 import logging
@@ -192,9 +192,10 @@ async def process_change_detection():
             return jsonify({'error': 'Both image_id_before and image_id_after are required'}), 400
         if not region:
             return jsonify({'error': 'Region is required'}), 400
-        if not validate_gee_asset(image_id_before):
+        before_valid, after_valid = await validate_gee_assets([image_id_before, image_id_after])
+        if not before_valid:
             return jsonify({'error': f'Invalid GEE asset: {image_id_before}'}), 400
-        if not validate_gee_asset(image_id_after):
+        if not after_valid:
             return jsonify({'error': f'Invalid GEE asset: {image_id_after}'}), 400
 
         aoi = parse_region(region)
@@ -359,15 +360,18 @@ async def process_metadata():
         if not request_model.collection_id and not request_model.image_id:
             return jsonify({'error': 'Either collection_id or image_id is required for metadata fetching'}), 400
         
-        # Validate GEE assets
-        if request_model.collection_id and not validate_gee_asset(request_model.collection_id):
-            return jsonify({'error': f'Invalid GEE collection asset: {request_model.collection_id}'}), 400
-            
-        if request_model.image_id and not validate_gee_asset(request_model.image_id):
-            return jsonify({'error': f'Invalid GEE image asset: {request_model.image_id}'}), 400
-            
-        if request_model.feature_collection_id and not validate_gee_asset(request_model.feature_collection_id):
-            return jsonify({'error': f'Invalid GEE feature collection asset: {request_model.feature_collection_id}'}), 400
+        # Validate GEE assets (concurrently)
+        assets = [
+            (asset_id, label) for asset_id, label in (
+                (request_model.collection_id, 'collection'),
+                (request_model.image_id, 'image'),
+                (request_model.feature_collection_id, 'feature collection'),
+            ) if asset_id
+        ]
+        validity = await validate_gee_assets([asset_id for asset_id, _ in assets])
+        for (asset_id, label), is_valid in zip(assets, validity):
+            if not is_valid:
+                return jsonify({'error': f'Invalid GEE {label} asset: {asset_id}'}), 400
         
         # Date validation for collection requests
         if request_model.collection_id and not request_model.image_id:
@@ -435,10 +439,10 @@ async def process_download():
         # Basic validation (add more specific checks if needed for download)
         if not (request_model.image_id or request_model.collection_id):
              return jsonify({'error': 'Either image_id or collection_id is required for download'}), 400
-        if request_model.collection_id and not validate_gee_asset(request_model.collection_id):
-             return jsonify({'error': f'Invalid GEE asset: {request_model.collection_id}'}), 400
-        if request_model.image_id and not validate_gee_asset(request_model.image_id):
-             return jsonify({'error': f'Invalid GEE asset: {request_model.image_id}'}), 400
+        asset_ids = [asset_id for asset_id in (request_model.collection_id, request_model.image_id) if asset_id]
+        for asset_id, is_valid in zip(asset_ids, await validate_gee_assets(asset_ids)):
+            if not is_valid:
+                return jsonify({'error': f'Invalid GEE asset: {asset_id}'}), 400
         # Region might be optional depending on whether the image/collection covers the whole globe
         # if not request_model.region:
         #     return jsonify({'error': 'Region is required'}), 400
@@ -14,9 +14,10 @@ from gee_app.utils.ee_utils import get_image_urls, parse_region
 from gee_app.utils.gee_utils import (
     load_image_or_collection,
     compute_index,
+    resolve_sensor,
     time_series_analysis_util
 )
-from gee_app.utils.sensor_utils import select_bands_for_satellite
+from gee_app.utils.sensor_utils import select_bands_for_satellite, sensor_from_id
 
 
 logger = logging.getLogger('gee_app')
@@ -551,9 +552,11 @@ async def drought_analysis_vegetation(
     collection = await load_image_or_collection(collection_id, is_collection=True, region=region)
     collection = collection.filterDate(start_date, end_date)
     
+    sensor = (sensor_from_id(collection_id) or resolve_sensor(collection.first())) if index in ['NDVI', 'EVI', 'NDWI'] else None
+
     # Use time_series_analysis_util with custom anomaly calculation
     def calculate_anomaly(image):
-        indexed = compute_index(image, index) if index in ['NDVI', 'EVI', 'NDWI'] else image.select(index).rename(index)
+        indexed = compute_index(image, index, sensor) if index in ['NDVI', 'EVI', 'NDWI'] else image.select(index).rename(index)
         month = ee.Date(image.get('system:time_start')).get('month')
         monthly_mean = ee.ImageCollection.fromImages(
             ee.List.sequence(1, 12).map(
@@ -2,11 +2,21 @@ import asyncio
 import os
 import logging
 import io
+import json
+import random
+import time
+import threading
+from datetime import datetime, timezone
+import httplib2
+import google_auth_httplib2
+import orjson
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.model import JsonModel
 from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload # Added MediaIoBaseDownload
 from google.oauth2 import service_account
-from google.auth.transport.requests import Request
-from typing import Optional, List, Dict
+from google.auth.transport.requests import Request, AuthorizedSession
+from typing import Optional, List, Dict, Callable, Any
 from gee_app.utils.auth import Config
 
 logger = logging.getLogger('gee_app')
@@ -14,48 +24,205 @@ logger = logging.getLogger('gee_app')
 GEE_KEY_FILE = Config.GEE_KEY_FILE
 GEE_SERVICE_ACCOUNT = Config.GEE_SERVICE_ACCOUNT
 
-def get_drive_service():
-    """Helper to create a Google Drive API service instance."""
-    SCOPES = ['https://www.googleapis.com/auth/drive']
-    credentials = service_account.Credentials.from_service_account_file(
-        GEE_KEY_FILE,
-        scopes=SCOPES,
-        subject=GEE_SERVICE_ACCOUNT
-    )
-    request = Request()
-    credentials.refresh(request)
-    return build('drive', 'v3', credentials=credentials)
-
-def get_gee_images_folder_id(drive_service) -> str:
-    """Get or create the GEE_Images folder ID."""
-    folder_query = "name='GEE_Images' and mimeType='application/vnd.google-apps.folder'"
-    logger.debug("Querying Drive with: %s", folder_query)
-    
+SCOPES = ['https://www.googleapis.com/auth/drive']
+DRIVE_API_URL = 'https://www.googleapis.com/drive/v3'
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+UPLOAD_CHUNK_SIZE = 16 * 1024 * 1024  # must be a multiple of 256 KiB
+
+# Credentials shared by the REST session and the media client; refreshed in the background
+# shortly before expiry so neither transport has to be rebuilt.
+_CREDENTIALS: Optional[service_account.Credentials] = None
+_credentials_lock = threading.Lock()
+TOKEN_REFRESH_MARGIN_SECONDS = 60
+
+# Shared session for the plain REST calls below; created lazily on first use.
+_SESSION: Optional[AuthorizedSession] = None
+# googleapiclient services are not thread-safe, so the media client is cached per thread.
+_thread_local = threading.local()
+
+# The GEE_Images folder ID never changes once found, so it is looked up once per process.
+_GEE_FOLDER_ID: Optional[str] = None
+_folder_id_lock = threading.Lock()
+
+# Drive answers transient overload with 403 (rate limit), 429 and 5xx; those are worth a retry.
+_RETRYABLE_STATUSES = {403, 429, 500, 502, 503, 504}
+# A 403 is only transient for the rate-limit reasons; 'quotaExceeded' and permission errors are not.
+_RETRYABLE_403_REASONS = {'userRateLimitExceeded', 'rateLimitExceeded'}
+
+def _error_reason(error: HttpError) -> Optional[str]:
+    """Extract the first 'reason' from a Drive error body, if any."""
     try:
-        response = drive_service.files().list(q=folder_query, spaces='drive').execute()
-        folders = response.get('files', [])
-        
-        if not folders:
-            logger.info("GEE_Images folder not found, creating it...")
-            folder_metadata = {
-                'name': 'GEE_Images',
-                'mimeType': 'application/vnd.google-apps.folder'
-            }
-            folder = drive_service.files().create(body=folder_metadata, fields='id').execute()
-            logger.info("Created GEE_Images folder with ID: %s", folder['id'])
-            return folder['id']
-        
-        folder_id = folders[0]['id']
-        logger.debug("Found GEE_Images folder with ID: %s", folder_id)
-        return folder_id
+        content = error.content.decode('utf-8') if isinstance(error.content, bytes) else error.content
+        errors = json.loads(content).get('error', {}).get('errors', [])
+        return errors[0].get('reason') if errors else None
+    except (ValueError, AttributeError, TypeError):
+        return None
+
+def _is_retryable(error: HttpError) -> bool:
+    status = error.resp.status
+    if status not in _RETRYABLE_STATUSES:
+        return False
+    if status == 403:
+        return _error_reason(error) in _RETRYABLE_403_REASONS
+    return True
+
+def _with_retry(fn: Callable[[], Any], *, retries: int = 5, base: float = 0.25) -> Any:
+    """
+    Call fn (typically a request's bound .execute), retrying transient Drive errors
+    with exponential backoff and jitter. Non-retryable errors are raised immediately.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except HttpError as e:
+            if attempt == retries or not _is_retryable(e):
+                raise
+            wait_time = base * 2 ** attempt + random.uniform(0, 0.1)
+            logger.warning("Drive request failed with %s (%s), retrying in %.2fs (attempt %d/%d)",
+                           e.resp.status, _error_reason(e), wait_time, attempt + 1, retries)
+            time.sleep(wait_time)
+
+def _schedule_token_refresh() -> None:
+    """Schedules a background refresh of the shared credentials just before they expire."""
+    delay = TOKEN_REFRESH_MARGIN_SECONDS
+    if _CREDENTIALS is not None and _CREDENTIALS.expiry:
+        now = datetime.now(timezone.utc).replace(tzinfo=None)  # google-auth expiry is naive UTC
+        remaining = (_CREDENTIALS.expiry - now).total_seconds()
+        delay = max(remaining - TOKEN_REFRESH_MARGIN_SECONDS, TOKEN_REFRESH_MARGIN_SECONDS)
+    timer = threading.Timer(delay, _refresh_credentials)
+    timer.daemon = True
+    timer.start()
+
+def _refresh_credentials() -> None:
+    try:
+        with _credentials_lock:
+            _CREDENTIALS.refresh(Request())
+        logger.debug("Refreshed Drive credentials, new expiry: %s", _CREDENTIALS.expiry)
     except Exception as e:
-        logger.error("Error finding or creating GEE_Images folder: %s", str(e))
-        raise
+        logger.warning("Background Drive token refresh failed: %s", str(e))
+    finally:
+        _schedule_token_refresh()
+
+def _get_credentials() -> service_account.Credentials:
+    """Returns the process-wide Drive credentials, loading and refreshing them on first use."""
+    global _CREDENTIALS
+    with _credentials_lock:
+        if _CREDENTIALS is None:
+            credentials = service_account.Credentials.from_service_account_file(
+                GEE_KEY_FILE,
+                scopes=SCOPES,
+                subject=GEE_SERVICE_ACCOUNT
+            )
+            credentials.refresh(Request())
+            _CREDENTIALS = credentials
+            _schedule_token_refresh()
+    return _CREDENTIALS
+
+def _get_session() -> AuthorizedSession:
+    """Returns the shared AuthorizedSession, creating it on first use."""
+    global _SESSION
+    if _SESSION is None:
+        _SESSION = AuthorizedSession(_get_credentials())
+    return _SESSION
+
+class _OrjsonModel(JsonModel):
+    """JsonModel that parses Drive responses with orjson; anything orjson rejects goes to the stock parser."""
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return super().deserialize(content)
+        if self._data_wrapper and isinstance(body, dict) and 'data' in body:
+            body = body['data']
+        return body
+
+def _rest(method: str, path: str, **kwargs) -> Dict:
+    """
+    Issue a Drive v3 REST call through the shared session, bypassing the discovery client.
+    Errors are raised as HttpError so _with_retry and callers treat them like client errors.
+    """
+    def send():
+        response = _get_session().request(method, f"{DRIVE_API_URL}{path}", **kwargs)
+        if response.status_code >= 400:
+            raise HttpError(httplib2.Response({'status': response.status_code}), response.content, uri=response.url)
+        return orjson.loads(response.content) if response.content else {}
+    return _with_retry(send)
+
+def _list(q: str, **params) -> Dict:
+    return _rest('GET', '/files', params={'q': q, 'spaces': 'drive', **params})
+
+def _get(file_id: str, fields: str) -> Dict:
+    return _rest('GET', f'/files/{file_id}', params={'fields': fields})
+
+def _create(body: Dict, fields: str = 'id') -> Dict:
+    return _rest('POST', '/files', json=body, params={'fields': fields})
+
+def _update(file_id: str, body: Dict, **params) -> Dict:
+    return _rest('PATCH', f'/files/{file_id}', json=body, params=params)
+
+def _delete(file_id: str) -> None:
+    _rest('DELETE', f'/files/{file_id}')
+
+def get_drive_service():
+    """
+    Returns this thread's Google Drive API service instance (used for media uploads/downloads).
+    The service wraps the shared credentials, so token refreshes never require a rebuild.
+    """
+    drive_service = getattr(_thread_local, 'drive_service', None)
+    if drive_service is None:
+        http = google_auth_httplib2.AuthorizedHttp(_get_credentials(), http=httplib2.Http())
+        drive_service = build('drive', 'v3', http=http, model=_OrjsonModel(), cache_discovery=False)
+        _thread_local.drive_service = drive_service
+    return drive_service
+
+def get_gee_images_folder_id(drive_service=None) -> str:
+    """
+    Get or create the GEE_Images folder ID, cached after the first lookup.
+    drive_service is accepted for backwards compatibility.
+    """
+    global _GEE_FOLDER_ID
+    if _GEE_FOLDER_ID is not None:
+        return _GEE_FOLDER_ID
+
+    with _folder_id_lock:
+        if _GEE_FOLDER_ID is not None:
+            return _GEE_FOLDER_ID
+
+        folder_query = f"name='GEE_Images' and mimeType='{FOLDER_MIME_TYPE}' and trashed = false"
+        logger.debug("Querying Drive with: %s", folder_query)
+        
+        try:
+            response = _list(folder_query)
+            folders = response.get('files', [])
+            
+            if not folders:
+                logger.info("GEE_Images folder not found, creating it...")
+                folder_metadata = {
+                    'name': 'GEE_Images',
+                    'mimeType': FOLDER_MIME_TYPE
+                }
+                folder = _create(folder_metadata)
+                logger.info("Created GEE_Images folder with ID: %s", folder['id'])
+                _GEE_FOLDER_ID = folder['id']
+                return _GEE_FOLDER_ID
+            
+            folder_id = folders[0]['id']
+            logger.debug("Found GEE_Images folder with ID: %s", folder_id)
+            _GEE_FOLDER_ID = folder_id
+            return folder_id
+        except Exception as e:
+            logger.error("Error finding or creating GEE_Images folder: %s", str(e))
+            raise
+
+def _forget_gee_images_folder_id() -> None:
+    """Drops the cached GEE_Images folder ID so the next lookup queries Drive again."""
+    global _GEE_FOLDER_ID
+    with _folder_id_lock:
+        _GEE_FOLDER_ID = None
 
 def list_images(place_name: Optional[str] = None) -> List[Dict]:
     """List all images in the GEE_Images folder (includes names)."""
-    drive_service = get_drive_service()
-    folder_id = get_gee_images_folder_id(drive_service)
+    folder_id = get_gee_images_folder_id()
     
     file_query = f"'{folder_id}' in parents"
     if place_name:
@@ -64,11 +231,7 @@ def list_images(place_name: Optional[str] = None) -> List[Dict]:
     logger.debug("Listing files with query: %s", file_query)
     
     try:
-        response = drive_service.files().list(
-            q=file_query,
-            spaces='drive',
-            fields='files(name, id, webViewLink)'
-        ).execute()
+        response = _list(file_query, fields='files(name, id, webViewLink)')
         files = response.get('files', [])
         
         file_list = [
@@ -88,7 +251,7 @@ def retrieve_image(file_id: str, target_directory: str, target_filename: Optiona
     try:
         os.makedirs(target_directory, exist_ok=True)
         # Get file metadata including name
-        file_metadata = drive_service.files().get(fileId=file_id, fields='name').execute()
+        file_metadata = _get(file_id, 'name')
         original_filename = file_metadata['name']
         filename = target_filename or original_filename # Use provided name or original name
         full_path = os.path.join(target_directory, filename)
@@ -101,7 +264,7 @@ def retrieve_image(file_id: str, target_directory: str, target_filename: Optiona
         downloader = MediaIoBaseDownload(fh, request)
         done = False
         while done is False:
-            status, done = downloader.next_chunk()
+            status, done = downloader.next_chunk(num_retries=5)
             if status:
                  logger.debug("Download %d%%.", int(status.progress() * 100))
 
@@ -121,11 +284,9 @@ def retrieve_image(file_id: str, target_directory: str, target_filename: Optiona
 
 def update_image(file_id: str, new_name: Optional[str] = None, new_file_path: Optional[str] = None) -> Dict:
     """Update an image in GEE_Images, return old and new names in response."""
-    drive_service = get_drive_service()
-    
     try:
         # Get the current file name before updating
-        old_metadata = drive_service.files().get(fileId=file_id, fields='name').execute()
+        old_metadata = _get(file_id, 'name')
         old_name = old_metadata['name']
         logger.debug("Updating image with ID: %s, current name: %s", file_id, old_name)
         
@@ -136,19 +297,22 @@ def update_image(file_id: str, new_name: Optional[str] = None, new_file_path: Op
         
         if new_file_path:
             logger.debug("Replacing content with file from: %s", new_file_path)
-            media = MediaFileUpload(new_file_path, mimetype='image/tiff')
-            updated_file = drive_service.files().update(
+            drive_service = get_drive_service()
+            # Resumable, chunked upload keeps memory bounded and resumes after transient failures
+            media = MediaFileUpload(new_file_path, mimetype='image/tiff', resumable=True, chunksize=UPLOAD_CHUNK_SIZE)
+            request = drive_service.files().update(
                 fileId=file_id,
                 body=file_metadata,
                 media_body=media,
                 fields='id, name, webViewLink'
-            ).execute()
+            )
+            updated_file = None
+            while updated_file is None:
+                status, updated_file = request.next_chunk(num_retries=5)
+                if status:
+                    logger.debug("Upload %d%%.", int(status.progress() * 100))
         else:
-            updated_file = drive_service.files().update(
-                fileId=file_id,
-                body=file_metadata,
-                fields='id, name, webViewLink'
-            ).execute()
+            updated_file = _update(file_id, file_metadata, fields='id, name, webViewLink')
         
         result = {
             "status": "success",
@@ -166,15 +330,13 @@ def update_image(file_id: str, new_name: Optional[str] = None, new_file_path: Op
 
 def delete_image(file_id: str) -> Dict:
     """Delete an image from GEE_Images, return deleted image name in response."""
-    drive_service = get_drive_service()
-    
     try:
         # Get the file name before deleting
-        file_metadata = drive_service.files().get(fileId=file_id, fields='name').execute()
+        file_metadata = _get(file_id, 'name')
         filename = file_metadata['name']
         logger.debug("Deleting image with ID: %s, name: %s", file_id, filename)
         
-        drive_service.files().delete(fileId=file_id).execute()
+        _delete(file_id)
         logger.info("Deleted image with ID: %s, name: %s", file_id, filename)
         return {
             "status": "success",
@@ -187,18 +349,17 @@ def delete_image(file_id: str) -> Dict:
 
 def create_folder(folder_name: str, parent_id: Optional[str] = None) -> Dict:
     """Create a new folder under GEE_Images or root, return name and ID in response."""
-    drive_service = get_drive_service()
     if not parent_id:
-        parent_id = get_gee_images_folder_id(drive_service)
+        parent_id = get_gee_images_folder_id()
     
     try:
         logger.debug("Creating folder with name: %s under parent ID: %s", folder_name, parent_id)
         folder_metadata = {
             'name': folder_name,
-            'mimeType': 'application/vnd.google-apps.folder',
+            'mimeType': FOLDER_MIME_TYPE,
             'parents': [parent_id]
         }
-        folder = drive_service.files().create(body=folder_metadata, fields='id, name').execute()
+        folder = _create(folder_metadata, fields='id, name')
         result = {
             "status": "success",
             "id": folder['id'],
@@ -213,11 +374,9 @@ def create_folder(folder_name: str, parent_id: Optional[str] = None) -> Dict:
 
 def update_folder(folder_id: str, new_name: Optional[str] = None, new_parent_id: Optional[str] = None) -> Dict:
     """Update a folder in Google Drive (rename or move)."""
-    drive_service = get_drive_service()
-    
     try:
         # Get current folder details
-        old_metadata = drive_service.files().get(fileId=folder_id, fields='name, parents').execute()
+        old_metadata = _get(folder_id, 'name, parents')
         old_name = old_metadata['name']
         old_parents = old_metadata.get('parents', [])
         logger.debug("Updating folder with ID: %s, current name: %s, current parents: %s", folder_id, old_name, old_parents)
@@ -242,12 +401,10 @@ def update_folder(folder_id: str, new_name: Optional[str] = None, new_parent_id:
                 "message": "No updates specified, folder unchanged"
             }
         
-        updated_file = drive_service.files().update(
-            fileId=folder_id,
-            body=file_metadata,
-            fields='id, name',
-            removeParents=','.join(old_parents) if new_parent_id else None  # Remove old parents if moving
-        ).execute()
+        params = {'fields': 'id, name'}
+        if new_parent_id:
+            params['removeParents'] = ','.join(old_parents)  # Remove old parents if moving
+        updated_file = _update(folder_id, file_metadata, **params)
         
         result = {
             "status": "success",
@@ -264,11 +421,9 @@ def update_folder(folder_id: str, new_name: Optional[str] = None, new_parent_id:
 
 def delete_folder(folder_id: str, recursive: bool = False) -> Dict:
     """Delete a folder from Google Drive, optionally recursively."""
-    drive_service = get_drive_service()
-    
     try:
         # Get folder name before deletion
-        folder_metadata = drive_service.files().get(fileId=folder_id, fields='name').execute()
+        folder_metadata = _get(folder_id, 'name')
         folder_name = folder_metadata['name']
         logger.debug("Deleting folder with ID: %s, name: %s, recursive: %s", folder_id, folder_name, recursive)
         
@@ -276,13 +431,15 @@ def delete_folder(folder_id: str, recursive: bool = False) -> Dict:
             # List and delete all contents
             contents = fetch_contents(folder_id)  # Reuse helper from list_folders_and_files
             for file in contents['files']:
-                drive_service.files().delete(fileId=file['id']).execute()
+                _delete(file['id'])
                 logger.debug("Deleted file %s in folder %s", file['name'], folder_name)
             for subfolder in contents['subfolders']:
                 delete_folder(subfolder['id'], recursive=True)  # Recursive call
                 logger.debug("Recursively deleted subfolder %s in folder %s", subfolder['name'], folder_name)
         
-        drive_service.files().delete(fileId=folder_id).execute()
+        _delete(folder_id)
+        if folder_id == _GEE_FOLDER_ID:
+            _forget_gee_images_folder_id()
         logger.info("Deleted folder with ID: %s, name: %s", folder_id, folder_name)
         return {
             "status": "success",
@@ -296,22 +453,17 @@ def delete_folder(folder_id: str, recursive: bool = False) -> Dict:
 # Ensure fetch_contents is available (from list_folders_and_files)
 def fetch_contents(folder_id: str) -> Dict:
     """Helper to fetch files and folders for a given folder ID."""
-    drive_service = get_drive_service()
     query = f"'{folder_id}' in parents"
-    response = drive_service.files().list(
-        q=query,
-        spaces='drive',
-        fields='files(name, id, webViewLink, mimeType)'
-    ).execute()
+    response = _list(query, fields='files(name, id, webViewLink, mimeType)')
     items = response.get('files', [])
     
     file_list = [
         {"name": f['name'], "id": f['id'], "url": f['webViewLink']}
-        for f in items if f['mimeType'] != 'application/vnd.google-apps.folder'
+        for f in items if f['mimeType'] != FOLDER_MIME_TYPE
     ]
     subfolders = [
         {"name": f['name'], "id": f['id']}
-        for f in items if f['mimeType'] == 'application/vnd.google-apps.folder'
+        for f in items if f['mimeType'] == FOLDER_MIME_TYPE
     ]
     
     subfolder_list = []
@@ -329,51 +481,15 @@ def fetch_contents(folder_id: str) -> Dict:
 
 def list_folders_and_files(parent_id: Optional[str] = None) -> Dict:
     """List all folders and files recursively starting from the specified parent or GEE_Images."""
-    drive_service = get_drive_service()
     if not parent_id:
-        parent_id = get_gee_images_folder_id(drive_service)
-    
-    def fetch_contents(folder_id: str) -> Dict:
-        """Helper to fetch files and folders for a given folder ID."""
-        # Query for all items in the folder (no MIME type filter in query)
-        query = f"'{folder_id}' in parents"
-        response = drive_service.files().list(
-            q=query,
-            spaces='drive',
-            fields='files(name, id, webViewLink, mimeType)'  # Add mimeType to filter in code
-        ).execute()
-        items = response.get('files', [])
-        
-        # Separate files and folders in code
-        file_list = [
-            {"name": f['name'], "id": f['id'], "url": f['webViewLink']}
-            for f in items if f['mimeType'] != 'application/vnd.google-apps.folder'
-        ]
-        subfolders = [
-            {"name": f['name'], "id": f['id']}
-            for f in items if f['mimeType'] == 'application/vnd.google-apps.folder'
-        ]
-        
-        # Recursively fetch contents of subfolders
-        subfolder_list = []
-        for subfolder in subfolders:
-            subfolder_contents = fetch_contents(subfolder['id'])
-            subfolder_info = {
-                "name": subfolder['name'],
-                "id": subfolder['id'],
-                "files": subfolder_contents['files'],
-                "subfolders": subfolder_contents['subfolders']
-            }
-            subfolder_list.append(subfolder_info)
-        
-        return {"files": file_list, "subfolders": subfolder_list}
+        parent_id = get_gee_images_folder_id()
     
     try:
         logger.debug("Listing folders and files starting from parent ID: %s", parent_id)
         contents = fetch_contents(parent_id)
         
         # Get the name of the root folder
-        root_metadata = drive_service.files().get(fileId=parent_id, fields='name').execute()
+        root_metadata = _get(parent_id, 'name')
         root_name = root_metadata['name']
         
         # Structure the response
@@ -408,24 +524,10 @@ def check_gee_images_folder(place_name: Optional[str] = None) -> List[Dict]:
     Raises:
         Exception: If Google Drive API access fails.
     """
-    SCOPES = ['https://www.googleapis.com/auth/drive']
-    credentials = service_account.Credentials.from_service_account_file(
-        GEE_KEY_FILE,
-        scopes=SCOPES,
-        subject=GEE_SERVICE_ACCOUNT
-    )
-    
-    # Refresh token
-    request = Request()
-    credentials.refresh(request)
-
-    # Build Google Drive API service
-    drive_service = build('drive', 'v3', credentials=credentials)
-
     try:
         # Query for GEE_Images folder
-        folder_query = "name='GEE_Images' mimeType='application/vnd.google-apps.folder'"
-        response = drive_service.files().list(q=folder_query, spaces='drive').execute()
+        folder_query = f"name='GEE_Images' mimeType='{FOLDER_MIME_TYPE}'"
+        response = _list(folder_query)
         folders = response.get('files', [])
 
         if not folders:
@@ -439,11 +541,7 @@ def check_gee_images_folder(place_name: Optional[str] = None) -> List[Dict]:
         file_query = f"'{folder_id}' in parents"
         if place_name:
             file_query += f" {place_name}"  # Filter by place_name in filename
-        files_response = drive_service.files().list(
-            q=file_query,
-            spaces='drive',
-            fields='files(name, id, webViewLink)'
-        ).execute()
+        files_response = _list(file_query, fields='files(name, id, webViewLink)')
         files = files_response.get('files', [])
 
         file_list = [
@@ -470,9 +568,8 @@ async def get_available_drive_storage() -> int:
     """
     def sync_get_storage():
         # Synchronous inner function to run in thread
-        drive_service = get_drive_service()
         logger.debug("Fetching Google Drive storage quota...")
-        about = drive_service.about().get(fields='storageQuota').execute()
+        about = _rest('GET', '/about', params={'fields': 'storageQuota'})
         storage_quota = about.get('storageQuota', {})
         limit = int(storage_quota.get('limit', 0))
         usage = int(storage_quota.get('usage', 0))
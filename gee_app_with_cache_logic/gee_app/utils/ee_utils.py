@@ -1,14 +1,21 @@
 import ee
 import logging
 import asyncio
-from typing import Any, Union, Dict, List, Optional
+from cachetools import TTLCache
+from pyproj import Geod
+from typing import Any, Union, Dict, List, Optional, NamedTuple, Set
 from gee_app.utils.sensor_utils import parse_region
 from gee_app.utils.drive_utils import get_gee_images_folder_id, get_available_drive_storage
+from gee_app.utils.cache_utils import get_cached_data_by_key, store_data_with_key
 import datetime
+import hashlib
+import json
 import time
+import math
+import random
 import re
-import requests # Added for image download
-import base64   # Added for image encoding
+from functools import lru_cache
+from types import MappingProxyType
 
 logger = logging.getLogger('gee_app')
 
@@ -17,11 +24,321 @@ class Config:
 
 GLOBAL_DEM_COLLECTIONS = ['USGS/SRTMGL1_003', 'NASA/NASADEM']
 
-# Store task statuses globally (use a DB in production)
-task_statuses = {}
+# WGS84 ellipsoid for true metre distances between AOI corners
+_GEOD = Geod(ellps='WGS84')
 
-import datetime
-import asyncio
+TASK_STATUS_MAX_ENTRIES = 10_000
+TASK_STATUS_TTL_SECONDS = 24 * 3600
+
+class TaskStatusStore:
+    """
+    Export task statuses shared by all workers. Entries are stored in Redis as JSON under
+    gee:task:<task_id> with a TTL, so any worker can answer a progress request. A bounded
+    in-process TTLCache mirrors every write and serves reads while Redis is unreachable.
+
+    The Redis client is synchronous; coroutines use the a* methods, which run the round-trips
+    in a worker thread so the event loop is never blocked on Redis.
+    """
+    KEY_PREFIX = "gee:task:"
+    REDIS_RETRY_SECONDS = 60
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.ttl = ttl
+        self._local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._redis_retry_at = 0.0
+
+    def _client(self):
+        """Returns the Redis client, or None while Redis is considered unavailable."""
+        if time.time() < self._redis_retry_at:
+            return None
+        try:
+            from gee_app.utils.cache_utils import get_redis_client  # Lazy: only needed once exports run
+            return get_redis_client()
+        except Exception as e:
+            logger.warning(f"⚠️ Redis unavailable for task statuses, using in-process store: {e}")
+            self._redis_retry_at = time.time() + self.REDIS_RETRY_SECONDS
+            return None
+
+    def get(self, task_id: str) -> Optional[Dict]:
+        client = self._client()
+        if client is not None:
+            try:
+                raw = client.get(f"{self.KEY_PREFIX}{task_id}")
+                if raw:
+                    return json.loads(raw)
+            except Exception as e:
+                logger.error(f"❌ Error reading status of task {task_id} from Redis: {e}")
+        return self._local.get(task_id)
+
+    def __getitem__(self, task_id: str) -> Dict:
+        status = self.get(task_id)
+        if status is None:
+            raise KeyError(task_id)
+        return status
+
+    def __setitem__(self, task_id: str, status: Dict) -> None:
+        self._local[task_id] = status
+        client = self._client()
+        if client is not None:
+            try:
+                client.setex(f"{self.KEY_PREFIX}{task_id}", self.ttl, json.dumps(status))
+            except Exception as e:
+                logger.error(f"❌ Error writing status of task {task_id} to Redis: {e}")
+
+    def __contains__(self, task_id: str) -> bool:
+        return self.get(task_id) is not None
+
+    def update_fields(self, task_id: str, fields: Dict, create: bool = True) -> Optional[Dict]:
+        """Merges fields into a task's status and writes it back. Returns the merged status."""
+        status = self.get(task_id)
+        if status is None:
+            if not create:
+                return None
+            status = {}
+        status.update(fields)
+        self[task_id] = status
+        return status
+
+    def update_many(self, updates: Dict[str, Dict], create: bool = True) -> None:
+        """update_fields for several tasks with one MGET and one pipelined batch of SETEX."""
+        task_ids = list(updates)
+        if not task_ids:
+            return
+        keys = [f"{self.KEY_PREFIX}{task_id}" for task_id in task_ids]
+        client = self._client()
+        stored = [None] * len(task_ids)
+        if client is not None:
+            try:
+                stored = [json.loads(raw) if raw else None for raw in client.mget(keys)]
+            except Exception as e:
+                logger.error(f"❌ Error reading status of {len(task_ids)} tasks from Redis: {e}")
+        merged = {}
+        for task_id, status in zip(task_ids, stored):
+            if status is None:
+                status = self._local.get(task_id)
+            if status is None:
+                if not create:
+                    continue
+                status = {}
+            status.update(updates[task_id])
+            self._local[task_id] = status
+            merged[task_id] = status
+        if client is not None and merged:
+            try:
+                pipe = client.pipeline(transaction=False)
+                for task_id, status in merged.items():
+                    pipe.setex(f"{self.KEY_PREFIX}{task_id}", self.ttl, json.dumps(status))
+                pipe.execute()
+            except Exception as e:
+                logger.error(f"❌ Error writing status of {len(merged)} tasks to Redis: {e}")
+
+    async def aget(self, task_id: str) -> Optional[Dict]:
+        return await asyncio.to_thread(self.get, task_id)
+
+    async def aset(self, task_id: str, status: Dict) -> None:
+        await asyncio.to_thread(self.__setitem__, task_id, status)
+
+    async def aupdate_many(self, updates: Dict[str, Dict], create: bool = True) -> None:
+        await asyncio.to_thread(self.update_many, updates, create)
+
+# Store task statuses in Redis so they are shared across workers (see TaskStatusStore)
+task_statuses = TaskStatusStore(maxsize=TASK_STATUS_MAX_ENTRIES, ttl=TASK_STATUS_TTL_SECONDS)
+
+# Task-status polling backs off exponentially (with jitter) while a task's state is unchanged
+STATUS_POLL_BASE_SECONDS = 5
+STATUS_POLL_MAX_SECONDS = 60
+
+def _poll_delay(attempt: int) -> float:
+    """Returns the wait before the next status poll: base * 2**attempt plus jitter, capped."""
+    return min(STATUS_POLL_MAX_SECONDS, STATUS_POLL_BASE_SECONDS * 2 ** attempt + random.uniform(0, 1))
+
+TERMINAL_TASK_STATES = {'COMPLETED', 'FAILED', 'CANCELLED'}
+EXPORT_MONITOR_TIMEOUT_SECONDS = 60 * 60
+
+class _PendingTask(NamedTuple):
+    """A task awaiting a terminal state. filename is set for Drive exports whose file must be located."""
+    future: asyncio.Future
+    deadline: float
+    filename: Optional[str] = None
+
+# Tasks awaiting a terminal state. A single reaper coroutine polls all of them with one
+# ee.data.getTaskStatus call per tick and resolves each task's future when it finishes.
+_pending_tasks: Dict[str, _PendingTask] = {}
+_reaper_task: Optional[asyncio.Task] = None
+# The event loop only keeps weak references to tasks, so the reaper's per-export
+# finalize tasks are held here until they finish
+_background_tasks: Set[asyncio.Task] = set()
+
+async def _task_status_reaper():
+    """Polls every pending export task in one batch until none remain."""
+    poll_attempt = 0
+    last_states: Dict[str, str] = {}
+    while _pending_tasks:
+        await asyncio.sleep(_poll_delay(poll_attempt))
+        poll_attempt += 1
+        await _expire_overdue_tasks()
+        if not _pending_tasks:
+            break
+        try:
+            # Blocking HTTPS call; run it off the event loop so other coroutines keep running
+            status_list = await asyncio.to_thread(ee.data.getTaskStatus, list(_pending_tasks))
+        except Exception as e:
+            logger.error(f"Error polling status of {len(_pending_tasks)} export tasks: {str(e)}")
+            continue
+
+        updates = {}
+        for status in status_list:
+            task_id = status.get('id')
+            state = status.get('state', 'UNKNOWN')
+            if last_states.get(task_id) != state:
+                # Progress observed, poll eagerly again
+                poll_attempt = 0
+                last_states[task_id] = state
+            updates[task_id] = {
+                "state": state,
+                "message": status.get('description') or status.get('error_message')
+            }
+            logger.info(f"Task {task_id} - State: {state}, Progress: {status.get('progress', 'N/A')}")
+        # Every task's status is written in one batch, before any finished export records its final status
+        await task_statuses.aupdate_many(updates, create=False)
+
+        for status in status_list:
+            task_id = status.get('id')
+            state = status.get('state', 'UNKNOWN')
+            if state in TERMINAL_TASK_STATES:
+                last_states.pop(task_id, None)
+                pending = _pending_tasks.pop(task_id, None)
+                if pending is None:
+                    continue
+                if pending.filename is None:
+                    _set_future_result(pending.future, status)
+                else:
+                    # Locating the exported file can take minutes, so it gets its own short-lived task
+                    task = asyncio.create_task(_finalize_export(task_id, status, pending))
+                    _background_tasks.add(task)
+                    task.add_done_callback(_background_tasks.discard)
+
+def _set_future_result(future: asyncio.Future, result: Any) -> None:
+    if not future.done():
+        future.set_result(result)
+
+async def _expire_overdue_tasks() -> None:
+    """Stops tracking tasks past their deadline and resolves their futures."""
+    now = time.time()
+    for task_id, pending in list(_pending_tasks.items()):
+        if now < pending.deadline:
+            continue
+        del _pending_tasks[task_id]
+        logger.warning(f"Monitoring for task {task_id} timed out.")
+        if pending.filename is None:
+            _set_future_result(pending.future, None)
+        else:
+            timeout_status = {
+                "state": "TIMEOUT",
+                "message": "Monitoring timed out before the export finished.",
+                "url": None, "file_id": None, "filename": pending.filename
+            }
+            await task_statuses.aset(task_id, timeout_status)
+            _set_future_result(pending.future, timeout_status)
+
+def _ensure_reaper_started():
+    global _reaper_task
+    if _reaper_task is None or _reaper_task.done():
+        _reaper_task = asyncio.create_task(_task_status_reaper())
+
+def _register_task(task_id: str, timeout: float, filename: Optional[str] = None) -> asyncio.Future:
+    """Registers task_id with the shared reaper and returns the future it will resolve."""
+    pending = _pending_tasks.get(task_id)
+    if pending is None:
+        future = asyncio.get_running_loop().create_future()
+        pending = _PendingTask(future, time.time() + timeout, filename)
+        _pending_tasks[task_id] = pending
+    _ensure_reaper_started()
+    return pending.future
+
+# Operation/band classification for default visualization ranges and palettes
+_VEG_INDEX_RE = re.compile(r'NDVI|EVI|NDMI')
+_REFLECTANCE_BAND_RE = re.compile(r'B8|NIR|B4|RED')
+
+# Tuples so every call shares the same palette object
+_NDVI_PALETTE = ("#d73027", "#f46d43", "#fdae61", "#fee08b", "#d9ef8b", "#a6d96a", "#66bd63", "#1a9850")
+_WATER_PALETTE = ("#ffffcc", "#a1dab4", "#41b6c4", "#2c7fb8", "#253494")
+_EVI_PALETTE = ("#ff0000", "#ffffff", "#00ff00")
+
+# Single-band palettes keyed by operation substring, checked in insertion (priority) order
+_PALETTES = {
+    'NDVI': _NDVI_PALETTE,
+    'NDWI': _WATER_PALETTE,
+    'Water': _WATER_PALETTE,
+    'EVI': _EVI_PALETTE,
+}
+
+# Read-only single-band defaults for the common index operations; callers copy and add bands/region
+_VIS_TEMPLATES = {
+    'NDVI': MappingProxyType({"min": -1, "max": 1, "palette": _NDVI_PALETTE}),
+    'EVI': MappingProxyType({"min": -1, "max": 1, "palette": _EVI_PALETTE}),
+    'NDWI': MappingProxyType({"min": -0.5, "max": 0.5, "palette": _WATER_PALETTE}),
+}
+
+# Simple polygons (a rectangle or a triangle) are measured client-side instead of via getInfo()
+LOCAL_BOUNDS_MAX_VERTICES = 5
+
+def _local_polygon_info(region: Any) -> Optional[tuple]:
+    """
+    Returns (area_km2, bounds_ring) for a single-ring GeoJSON Polygon dict with at most
+    LOCAL_BOUNDS_MAX_VERTICES vertices, or None if the region needs the Earth Engine path.
+    The bounds ring follows the ee.Geometry.bounds() vertex order (SW, SE, NE, NW, SW).
+    """
+    if not isinstance(region, dict) or region.get('type') != 'Polygon':
+        return None
+    rings = region.get('coordinates') or []
+    if len(rings) != 1 or not 3 <= len(rings[0]) <= LOCAL_BOUNDS_MAX_VERTICES:
+        return None
+    ring = rings[0]
+    lons = [point[0] for point in ring]
+    lats = [point[1] for point in ring]
+    min_lon, max_lon, min_lat, max_lat = min(lons), max(lons), min(lats), max(lats)
+
+    # Shoelace area in square degrees, scaled to km² at the ring's mean latitude
+    area_deg2 = abs(sum(lons[i] * lats[i + 1] - lons[i + 1] * lats[i] for i in range(-1, len(ring) - 1))) / 2
+    center_lat = (min_lat + max_lat) / 2
+    area_km2 = area_deg2 * 111.32 ** 2 * math.cos(math.radians(center_lat))
+
+    bounds = [[min_lon, min_lat], [max_lon, min_lat], [max_lon, max_lat], [min_lon, max_lat], [min_lon, min_lat]]
+    return area_km2, bounds
+
+# AOIs up to this size try getDownloadURL before falling back to a Drive export. The
+# request is bounded by GEE's download size cap rather than area, so this is generous
+# and the size errors below decide when an export is really needed.
+DOWNLOAD_URL_MAX_AREA_KM2 = 1000
+# getDownloadURL size-limit error: "Total request size (N bytes) must be less than or equal to M bytes."
+_REQUEST_SIZE_RE = re.compile(r'Total request size \((\d+) bytes\)')
+_SIZE_LIMIT_MESSAGE = "must be less than or equal to"
+# Lower-cased fragments of the getDownloadURL errors that no retry can fix
+_DOWNLOAD_TOO_LARGE_MARKERS = ("memory limit exceeded", "payload size exceeded", "total request size")
+
+def _is_download_too_large(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(marker in message for marker in _DOWNLOAD_TOO_LARGE_MARKERS)
+
+# Thumbnail/download URLs are cached under the serialized computation graph, so any request
+# that rebuilds the same index image over the same AOI reuses them. GEE URLs expire, so the
+# TTL is kept short.
+IMAGE_URL_CACHE_TTL = 3600
+
+def _image_urls_cache_key(image: ee.Image, aoi: ee.Geometry, bands: List[str], scale: int,
+                          vis_params: Dict, crs: str, format: str, need_thumb: bool) -> str:
+    key_data = json.dumps({
+        "image": image.serialize(),
+        "aoi": aoi.serialize(),
+        "bands": bands,
+        "scale": scale,
+        "vis": {k: v for k, v in vis_params.items() if k != "region"},
+        "crs": crs,
+        "format": format,
+        "need_thumb": need_thumb,
+    }, sort_keys=True, default=str)
+    return f"image_urls:{hashlib.sha256(key_data.encode('utf-8')).hexdigest()}"
 
 async def get_image_urls(
     image: ee.Image,
@@ -33,50 +350,72 @@ async def get_image_urls(
     visualization_params: Optional[Dict] = None,
     crs: Optional[str] = None,
     format: str = "GEO_TIFF",
-    max_retries: int = 3
+    max_retries: int = 3,
+    need_thumb: bool = True
 ) -> Dict:
 
     aoi = parse_region(region) if isinstance(region, (str, Dict)) else region or image.geometry()
     vis_bands = bands if isinstance(bands, list) else [bands]
     logger.debug(f"Using bands for visualization: {vis_bands}")
 
-    # Check area and adjust scale if too large
-    area = aoi.area(maxError=1000).getInfo() / 1e6  # sq km
+    # Check area and adjust scale if too large. Simple polygons are measured locally;
+    # anything else has area and bounds fetched in a single round-trip.
+    local_info = _local_polygon_info(region)
+    if local_info:
+        area, bounds = local_info  # sq km
+    else:
+        aoi_info = ee.Dictionary({
+            'area_km2': aoi.area(maxError=1000).divide(1e6),
+            'bounds': aoi.bounds().coordinates()
+        }).getInfo()
+        area = aoi_info['area_km2']  # sq km
+        bounds = aoi_info['bounds'][0]
     pixel_limit = 32768
-    bounds = aoi.bounds().coordinates().getInfo()[0]
-    width_m = abs(bounds[2][0] - bounds[0][0]) * 111320  # Rough meters (lon to m at equator)
-    height_m = abs(bounds[2][1] - bounds[0][1]) * 111320  # Rough meters (lat to m)
-    width_px = width_m / scale
-    height_px = height_m / scale
+    # Geodesic extents on the WGS84 ellipsoid. Width is measured on the latitude nearest the
+    # equator, where the box is widest, so the pixel limit check stays conservative.
+    (west, south), (east, north) = bounds[0], bounds[2]
+    width_lat = 0 if south <= 0 <= north else min(south, north, key=abs)
+    _, _, width_m = _GEOD.inv(west, width_lat, east, width_lat)
+    _, _, height_m = _GEOD.inv(west, south, west, north)
+    width_m, height_m = int(width_m), int(height_m)
+    width_px = width_m // scale
+    height_px = height_m // scale
     
     if width_px > pixel_limit or height_px > pixel_limit:
-        new_scale = max(width_m / pixel_limit, height_m / pixel_limit)
-        logger.warning(f"Pixel dimensions ({int(width_px)}x{int(height_px)}) exceed {pixel_limit}. Adjusting scale from {scale} to {int(new_scale)}")
-        scale = int(new_scale)
+        new_scale = -(-max(width_m, height_m) // pixel_limit)  # ceiling division
+        logger.warning(f"Pixel dimensions ({width_px}x{height_px}) exceed {pixel_limit}. Adjusting scale from {scale} to {new_scale}")
+        scale = new_scale
 
-    if not visualization_params:
+    if not visualization_params and len(vis_bands) == 1 and operation in _VIS_TEMPLATES:
+        visualization_params = {**_VIS_TEMPLATES[operation], "bands": vis_bands, "region": aoi}
+    elif not visualization_params:
         min_val, max_val = 0, 3000
-        if any(index in operation for index in ['NDVI', 'EVI', 'NDMI']):
+        if _VEG_INDEX_RE.search(operation):
             min_val, max_val = -1, 1
         elif 'NDWI' in operation:
             min_val, max_val = -0.5, 0.5
-        elif any(band in str(bands) for band in ['B8', 'NIR', 'B4', 'RED']):
+        elif _REFLECTANCE_BAND_RE.search(str(bands)):
             min_val, max_val = 0, 0.4
         
         visualization_params = {"bands": vis_bands, "min": min_val, "max": max_val, "region": aoi}
         if len(vis_bands) == 1:
-            if 'NDVI' in operation:
-                visualization_params["palette"] = ["#d73027", "#f46d43", "#fdae61", "#fee08b", "#d9ef8b", "#a6d96a", "#66bd63", "#1a9850"]
-            elif 'Water' in operation or 'NDWI' in operation:
-                visualization_params["palette"] = ["#ffffcc", "#a1dab4", "#41b6c4", "#2c7fb8", "#253494"]
-            elif 'EVI' in operation:
-                visualization_params["palette"] = ["#ff0000", "#ffffff", "#00ff00"]
+            palette_key = next((key for key in _PALETTES if key in operation), None)
+            if palette_key:
+                visualization_params["palette"] = _PALETTES[palette_key]
     else:
         visualization_params["bands"] = vis_bands
         visualization_params["region"] = aoi
     logger.debug(f"Visualization params: {visualization_params}")
+    crs = crs or "EPSG:4326"
 
-    thumb_url = image.getThumbURL(visualization_params)
+    cache_key = _image_urls_cache_key(image, aoi, vis_bands, scale, visualization_params, crs, format, need_thumb)
+    cached = await asyncio.to_thread(get_cached_data_by_key, cache_key)
+    if cached:
+        logger.debug(f"Reusing cached URLs for {operation}")
+        return cached["data"]
+
+    # Skip the thumbnail round-trip when the caller only wants the full-resolution output
+    thumb_url = image.getThumbURL(visualization_params) if need_thumb else None
     
     if area > 5000:
         logger.warning("AOI too large, reducing to 50km radius.")
@@ -86,9 +425,8 @@ async def get_image_urls(
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     safe_place_name = place_name.replace(" ", "_") if place_name else "region"
     export_name = f"{safe_place_name}_{operation}_{timestamp}"
-    crs = crs or "EPSG:4326"
     
-    if area < 150:
+    if area < DOWNLOAD_URL_MAX_AREA_KM2:
         full_res_params = {"bands": vis_bands, "region": aoi, "scale": scale, "format": format, "crs": crs}
         retry_count = 0
         while retry_count < max_retries:
@@ -96,10 +434,16 @@ async def get_image_urls(
                 full_res_url = image.getDownloadURL(full_res_params)
                 full_res_info = {"full_res_url": full_res_url, "format": format}
                 logger.debug(f"Generated full-res URL for {operation}")
+                # Only direct download URLs are cached; exports are tracked per task
+                await asyncio.to_thread(
+                    store_data_with_key, cache_key,
+                    {"thumb_url": thumb_url, "full_res_info": full_res_info}, IMAGE_URL_CACHE_TTL
+                )
                 break
             except ee.EEException as e:
                 retry_count += 1
-                if retry_count >= max_retries or "User memory limit exceeded" in str(e):
+                # Size errors go straight to export; anything else is retried with backoff first
+                if retry_count >= max_retries or _is_download_too_large(e):
                     logger.warning(f"getDownloadURL failed for {operation}: {str(e)}. Falling back to export.")
                     full_res_info = await export_to_drive_async(image, vis_bands, scale, aoi, export_name, crs, format)
                     break
@@ -139,8 +483,6 @@ async def export_to_drive_async(
     Returns:
         Dictionary with export status information
     """
-    from .drive_utils import get_drive_service  # Import here
-    
     # Configure the export
     export_config = {
         'image': image.select(bands),
@@ -161,148 +503,30 @@ async def export_to_drive_async(
     
     logger.info(f"Started export task {task_id} for {export_name}")
     
-    # Create or retrieve task status dictionary if not already defined
-    global task_statuses
-    if 'task_statuses' not in globals():
-        task_statuses = {}
-    
-    # Monitor the task status
-    task_statuses[task_id] = {"state": "RUNNING", "message": "Export initiated", "url": None}
-    
-    # Maximum time to wait (30 minutes)
-    max_wait_time = 30 * 60
-    wait_start_time = time.time()
-    
-    while True:
-        try:
-            status = ee.data.getTaskStatus(task_id)[0]
-            state = status.get('state', 'UNKNOWN')
-            progress = status.get('progress', 'N/A')
-            message = status.get('description', 'Processing...')
-            
-            # Update status in the global tracker
-            task_statuses[task_id] = {"state": state, "message": message, "url": None}
-            logger.info(f"Task {task_id} - State: {state}, Progress: {progress}, Message: {message}")
-            
-            # Check for completion states
-            if state in ['COMPLETED', 'FAILED', 'CANCELLED']:
-                break
-                
-            # Check for timeout
-            if time.time() - wait_start_time > max_wait_time:
-                task_statuses[task_id] = {"state": "TIMEOUT", "message": "Export timed out after 30 minutes", "url": None}
-                logger.warning(f"Export task {task_id} timed out after 30 minutes")
-                return {"status": "timeout", "message": "Export timed out after 30 minutes"}
-                
-            # Wait before checking again
-            await asyncio.sleep(10)
-                
-        except Exception as e:
-            logger.error(f"Error monitoring task {task_id}: {str(e)}")
-            await asyncio.sleep(15)  # Wait longer on error
-    
-    # Handle non-successful completion
-    if status['state'] != 'COMPLETED':
-        error_msg = status.get('error_message', 'Unknown error')
-        task_statuses[task_id] = {"state": "FAILED", "message": f"Export failed: {error_msg}", "url": None}
-        logger.error(f"Export {task_id} failed: {error_msg}")
-        return {"status": "failed", "message": error_msg}
-    
-    # Get Drive file information
-    try:
-        drive_service = get_drive_service()
-        
-        # First, find the GEE_Images folder or create it if it doesn't exist
-        folder_query = "name='GEE_Images' and mimeType='application/vnd.google-apps.folder'"
-        folder_response = drive_service.files().list(
-            q=folder_query, 
-            spaces='drive', 
-            fields='files(id, name)'
-        ).execute()
-        
-        folders = folder_response.get('files', [])
-        if not folders:
-            folder_metadata = {'name': 'GEE_Images', 'mimeType': 'application/vnd.google-apps.folder'}
-            folder = drive_service.files().create(body=folder_metadata, fields='id').execute()
-            folder_id = folder['id']
-            logger.info(f"Created GEE_Images folder with ID: {folder_id}")
-        else:
-            folder_id = folders[0]['id']
-            logger.info(f"Found existing GEE_Images folder with ID: {folder_id}")
-        
-        # Now find the exported file
-        file_extension = ".tif" if format in ["GEO_TIFF", "GeoTIFF"] else f".{format.lower()}"
-        file_query = f"name='{export_name}{file_extension}' and '{folder_id}' in parents"
-        
-        # Wait for the file to appear (up to 2 minutes)
-        file_found = False
-        file_wait_start = time.time()
-        max_file_wait = 120  # 2 minutes
-        
-        while not file_found and time.time() - file_wait_start < max_file_wait:
-            file_response = drive_service.files().list(
-                q=file_query,
-                spaces='drive',
-                fields='files(id, name, webViewLink)'
-            ).execute()
-            
-            files = file_response.get('files', [])
-            if files:
-                file_found = True
-                file_id = files[0]['id']
-                drive_url = files[0]['webViewLink']
-                
-                # Generate a direct download link if needed
-                download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
-                
-                result = {
-                    "status": "completed", 
-                    "message": f"Exported to Drive as '{export_name}{file_extension}'",
-                    "drive_url": drive_url,
-                    "download_url": download_url,
-                    "file_id": file_id
-                }
-                
-                # Store file_id and url in task status upon completion
-                task_statuses[task_id] = {
-                    "state": "COMPLETED",
-                    "message": result["message"],
-                    "url": drive_url, # Keep the web view link
-                    "file_id": file_id, # Add the file ID
-                    "filename": f"{export_name}{file_extension}" # Store the expected filename
-                }
+    filename = _export_filename(export_name, format)
+    await task_statuses.aset(task_id, {"state": "RUNNING", "message": "Export initiated", "url": None, "file_id": None, "filename": filename})
 
-                logger.info(f"Export completed! File {export_name}{file_extension} (ID: {file_id}) at {drive_url}")
-                return result
-            
-            await asyncio.sleep(5)
-        
-        # If we get here, the file wasn't found in Drive after waiting
-        task_statuses[task_id] = {
-            "state": "FILE_NOT_FOUND", # Use a more specific state
-            "message": f"Export task completed, but file '{export_name}{file_extension}' not found in Drive after {max_file_wait}s.",
-            "url": None,
-            "file_id": None, # Explicitly set file_id to None
-            "filename": f"{export_name}{file_extension}"
-        }
+    # Wait (up to 30 minutes) for the shared reaper to finish the task and locate its Drive file
+    status = await _register_task(task_id, 30 * 60, filename)
+    state = status["state"]
 
-        logger.warning(f"File '{export_name}{file_extension}' not found in GEE_Images folder after task completion.")
+    if state == "COMPLETED":
+        file_id = status["file_id"]
+        logger.info(f"Export completed! File {filename} (ID: {file_id}) at {status['url']}")
         return {
-            "status": "file_not_found",
-            "message": f"Export reported as complete, but file '{export_name}{file_extension}' not found in Drive"
-        }
-        
-    except Exception as e:
-        # Error during Drive API interaction after task completion
-        task_statuses[task_id] = {
-            "state": "DRIVE_API_ERROR", # Specific error state
-            "message": f"Drive API error after task completion: {str(e)}",
-            "url": None,
-            "file_id": None,
-            "filename": f"{export_name}{file_extension}"
+            "status": "completed",
+            "message": f"Exported to Drive as '{filename}'",
+            "drive_url": status["url"],
+            "download_url": f"https://drive.google.com/uc?export=download&id={file_id}",
+            "file_id": file_id
         }
-        logger.error(f"Drive API error after task completion for {task_id}: {str(e)}")
-        return {"status": "error", "message": f"Drive API error: {str(e)}"} # Return error status
+    if state == "TIMEOUT":
+        return {"status": "timeout", "message": "Export timed out after 30 minutes"}
+    if state == "FILE_NOT_FOUND":
+        return {"status": "file_not_found", "message": f"Export reported as complete, but file '{filename}' not found in Drive"}
+    if state == "DRIVE_API_ERROR":
+        return {"status": "error", "message": status["message"]}
+    return {"status": "failed", "message": status["message"]}
 
 async def export_to_drive(
     image: ee.Image,  # This will now be the *visualized* image
@@ -332,7 +556,8 @@ async def export_to_drive(
                   (e.g., specific fileFormatArguments).
 
     Returns:
-        A dictionary containing the export task ID and status message.
+        A dictionary containing the export task ID and status message, plus a
+        'completion' asyncio.Future that resolves to the final task status.
     """
     try:
         # Prepare parameters for the export task
@@ -342,7 +567,7 @@ async def export_to_drive(
             'description': export_name,
             'folder': folder,
             'scale': scale,
-            'region': region.getInfo()['coordinates'] if isinstance(region, ee.Geometry) else region, # Pass coordinates for robustness
+            'region': region, # ee.Geometry is serialized with the task, no getInfo() round-trip needed
             'fileFormat': fileFormat,
             'maxPixels': maxPixels,
             **kwargs # Include any other passed arguments
@@ -362,32 +587,28 @@ async def export_to_drive(
         task_id = export_task.id
         logger.info(f"🚀 Started Drive export task {task_id} for '{export_name}'")
 
-        # Determine file extension based on format for reporting
-        file_extension = fileFormat.lower()
-        if file_extension == "geotiff":
-            file_extension = "tif"
-        elif file_extension == "tfrecord":
-            file_extension = "tfrecord.gz" # GEE default naming
+        filename = _export_filename(export_name, fileFormat)
 
         # Initialize task status tracking
         # Ensure the filename reflects the actual export format
-        task_statuses[task_id] = {
+        await task_statuses.aset(task_id, {
             "state": "STARTED", # Consistent state naming
             "message": "Export task submitted to GEE.",
             "url": None, # URL will be potentially updated by monitoring task later
             "file_id": None, # File ID will be potentially updated by monitoring task later
-            "filename": f"{export_name}.{file_extension}" # Store expected filename
-        }
+            "filename": filename # Store expected filename
+        })
 
-        # Start background monitoring task
-        # Pass only task_id; monitor_export_task should handle fetching details if needed
-        asyncio.create_task(monitor_export_task(task_id))
+        # Hand the task to the shared status reaper; it resolves this future with the final
+        # status (including the Drive file) once the export finishes
+        completion = _register_task(task_id, EXPORT_MONITOR_TIMEOUT_SECONDS, filename)
 
         return {
             "full_res_url": None, # No direct URL when exporting to Drive
-            "message": f"Export started as '{export_name}.{file_extension}' in '{folder}'. Check progress with task ID.",
+            "message": f"Export started as '{filename}' in '{folder}'. Check progress with task ID.",
             "task_id": task_id,
-            "status": "STARTED" # Return initial status
+            "status": "STARTED", # Return initial status
+            "completion": completion # asyncio.Future; await it for the final status, drop it before serializing
         }
 
     except ee.EEException as gee_error:
@@ -398,138 +619,140 @@ async def export_to_drive(
         # Re-raise or return an error status suitable for your application
         raise RuntimeError(f"Unexpected error initiating export task: {str(e)}") from e
 
-async def monitor_export_task(task_id: str, export_name: str, format: str = "GEO_TIFF"):
-     """Monitors a GEE export task and updates its status, including finding the file on Drive."""
-     # This function contains the logic previously in export_to_drive_async, but focused on monitoring an existing task_id
-     # It's called via asyncio.create_task by export_to_drive
-
-     global task_statuses
-     logger.info(f"Monitoring started for task {task_id} ({export_name})")
-
-     # Maximum time to wait (e.g., 1 hour, adjust as needed)
-     max_wait_time = 60 * 60
-     wait_start_time = time.time()
-     check_interval = 30 # Check every 30 seconds
+async def batch_export_images(
+    images: List[ee.Image],
+    scale: int,
+    region: ee.Geometry,
+    export_name: str,
+    **kwargs: Any
+) -> Dict:
+    """
+    Exports many images (e.g. adjacent tiles) as a single Drive export task.
 
-     while True:
-        current_time = time.time()
-        if current_time - wait_start_time > max_wait_time:
-            task_statuses[task_id] = {
-                "state": "TIMEOUT",
-                "message": f"Monitoring timed out after {max_wait_time / 60} minutes.",
-                "url": None, "file_id": None, "filename": task_statuses[task_id].get("filename")
-            }
-            logger.warning(f"Monitoring for task {task_id} timed out.")
-            break # Exit monitoring loop
+    The images are mosaicked server-side (later images on top) and handed to
+    export_to_drive, so a batch costs one task against the per-user task limit
+    instead of one per image. The images must share the same bands; split the
+    resulting file client-side if per-tile outputs are needed.
 
-        try:
-            # Get the latest status from GEE
-            status_list = ee.data.getTaskStatus(task_id)
-            if not status_list:
-                 logger.warning(f"Task {task_id} status not found in GEE.")
-                 # Keep previous status or mark as unknown? For now, keep polling.
-                 await asyncio.sleep(check_interval)
-                 continue
-
-            status = status_list[0]
-            state = status.get('state', 'UNKNOWN')
-            message = status.get('description', 'Processing...')
-            error_msg = status.get('error_message')
+    Args:
+        images: The ee.Image objects to export together.
+        scale: The scale (resolution) in meters.
+        region: The ee.Geometry covering all images (e.g. the union of their footprints).
+        export_name: The base name for the exported file (without extension).
+        **kwargs: Passed through to export_to_drive (folder, fileFormat, crs, ...).
 
-            # Update our global status tracker
-            task_statuses[task_id].update({"state": state, "message": message or error_msg}) # Update existing entry
+    Returns:
+        The export_to_drive result for the combined task.
+    """
+    if not images:
+        raise ValueError("batch_export_images requires at least one image")
+
+    mosaic = images[0] if len(images) == 1 else ee.ImageCollection.fromImages(images).mosaic()
+    logger.info(f"Exporting {len(images)} images as a single mosaic '{export_name}'")
+    return await export_to_drive(mosaic, scale, region, export_name, **kwargs)
+
+def _export_filename(export_name: str, file_format: str) -> str:
+    """Returns the file name GEE gives an export of the given format in Drive."""
+    file_extension = file_format.lower()
+    if file_extension in ("geotiff", "geo_tiff"):
+        file_extension = "tif"
+    elif file_extension == "tfrecord":
+        file_extension = "tfrecord.gz" # GEE default naming
+    return f"{export_name}.{file_extension}"
+
+async def _find_drive_file(filename: str, max_wait: float, interval: float = 10) -> Optional[Dict]:
+    """
+    Looks up an exported file in the GEE_Images folder, waiting up to max_wait seconds for it
+    to appear. Returns the file's id/name/webViewLink, or None if it never shows up.
+    Drive API errors are raised to the caller.
+    """
+    from .drive_utils import _list # Local import
+    folder_id = await asyncio.to_thread(get_gee_images_folder_id) # Cached after first lookup
+    file_query = f"name='{filename}' and '{folder_id}' in parents and trashed = false"
 
-            logger.info(f"Task {task_id} - State: {state}") # Less verbose logging during monitoring
+    deadline = time.time() + max_wait
+    while True:
+        # Raw REST call over the shared session (retried on transient errors); it blocks, so run it in a worker thread
+        file_response = await asyncio.to_thread(
+            _list, file_query, fields='files(id, name, webViewLink)', pageSize=1, orderBy='createdTime desc'
+        )
+        files = file_response.get('files', [])
+        if files:
+            return files[0]
+        if time.time() + interval > deadline:
+            return None
+        await asyncio.sleep(interval)
+
+async def _finalize_export(task_id: str, status: Dict, pending: _PendingTask):
+    """Records the outcome of a finished export (locating its file on Drive) and resolves its future."""
+    filename_to_find = pending.filename
+    state = status.get('state', 'UNKNOWN')
+    message = status.get('description', 'Processing...')
+    error_msg = status.get('error_message')
+    # Mutated locally and written back once, so the store sees a single final update
+    task_status = await task_statuses.aget(task_id) or {"url": None, "file_id": None, "filename": filename_to_find}
 
-            if state == 'COMPLETED':
-                logger.info(f"Task {task_id} completed. Attempting to find file in Drive...")
-                # --- Find file in Drive ---
-                try:
-                    from .drive_utils import get_drive_service # Local import
-                    drive_service = get_drive_service()
-                    folder_id = get_gee_images_folder_id(drive_service) # Ensure folder exists
-
-                    file_extension = ".tif" if format in ["GEO_TIFF", "GeoTIFF"] else f".{format.lower()}"
-                    filename_to_find = f"{export_name}{file_extension}"
-                    file_query = f"name='{filename_to_find}' and '{folder_id}' in parents and trashed = false"
-
-                    file_found = False
-                    file_wait_start = time.time()
-                    max_file_wait = 180 # Wait up to 3 minutes for file to appear after completion
-
-                    while not file_found and time.time() - file_wait_start < max_file_wait:
-                        file_response = drive_service.files().list(
-                            q=file_query, spaces='drive', fields='files(id, name, webViewLink)'
-                        ).execute()
-                        files = file_response.get('files', [])
-
-                        if files:
-                            file_found = True
-                            file_info = files[0]
-                            file_id = file_info['id']
-                            drive_url = file_info['webViewLink']
-                            final_message = f"Export completed and file found in Drive: {filename_to_find}"
-
-                            task_statuses[task_id].update({
-                                "state": "COMPLETED",
-                                "message": final_message,
-                                "url": drive_url,
-                                "file_id": file_id,
-                                "filename": filename_to_find # Confirm filename
-                            })
-                            logger.info(f"Task {task_id}: {final_message} (ID: {file_id})")
-                            break # Exit file search loop
-
-                        await asyncio.sleep(10) # Wait before checking Drive again
-
-                    if not file_found:
-                         # File not found after waiting
-                         file_not_found_message = f"Export task completed, but file '{filename_to_find}' not found in Drive after {max_file_wait}s."
-                         task_statuses[task_id].update({
-                             "state": "FILE_NOT_FOUND",
-                             "message": file_not_found_message,
-                             "url": None, "file_id": None
-                         })
-                         logger.warning(f"Task {task_id}: {file_not_found_message}")
-
-                except Exception as drive_err:
-                    # Error interacting with Drive API
-                    drive_error_message = f"Drive API error after task completion: {str(drive_err)}"
-                    task_statuses[task_id].update({
-                        "state": "DRIVE_API_ERROR",
-                        "message": drive_error_message,
+    try:
+        if state == 'COMPLETED':
+            logger.info(f"Task {task_id} completed. Attempting to find file in Drive...")
+            try:
+                file_info = await _find_drive_file(filename_to_find, max_wait=180)
+                if file_info:
+                    final_message = f"Export completed and file found in Drive: {filename_to_find}"
+                    task_status.update({
+                        "state": "COMPLETED",
+                        "message": final_message,
+                        "url": file_info['webViewLink'],
+                        "file_id": file_info['id'],
+                        "filename": filename_to_find # Confirm filename
+                    })
+                    logger.info(f"Task {task_id}: {final_message} (ID: {file_info['id']})")
+                else:
+                    file_not_found_message = f"Export task completed, but file '{filename_to_find}' not found in Drive after 180s."
+                    task_status.update({
+                        "state": "FILE_NOT_FOUND",
+                        "message": file_not_found_message,
                         "url": None, "file_id": None
                     })
-                    logger.error(f"Task {task_id}: {drive_error_message}")
-                # --- End Find file in Drive ---
-                break # Exit monitoring loop (Task completed)
-
-            elif state in ['FAILED', 'CANCELLED']:
-                final_message = f"Export {state.lower()}: {error_msg or message}"
-                task_statuses[task_id].update({"state": state, "message": final_message})
-                logger.error(f"Task {task_id} {state}: {error_msg or message}")
-                break # Exit monitoring loop
-
-            # If still RUNNING or READY, wait and check again
-            await asyncio.sleep(check_interval)
-
-        except ee.EEException as gee_err:
-             logger.error(f"GEE error monitoring task {task_id}: {str(gee_err)}")
-             # Decide whether to stop monitoring or keep trying
-             await asyncio.sleep(check_interval * 2) # Wait longer after GEE error
-        except Exception as e:
-            logger.error(f"Unexpected error monitoring task {task_id}: {str(e)}")
-            # Stop monitoring on unexpected errors?
-            task_statuses[task_id].update({"state": "MONITORING_ERROR", "message": f"Unexpected monitoring error: {str(e)}"})
-            break # Exit monitoring loop
+                    logger.warning(f"Task {task_id}: {file_not_found_message}")
+
+            except Exception as drive_err:
+                # Error interacting with Drive API
+                drive_error_message = f"Drive API error after task completion: {str(drive_err)}"
+                task_status.update({
+                    "state": "DRIVE_API_ERROR",
+                    "message": drive_error_message,
+                    "url": None, "file_id": None
+                })
+                logger.error(f"Task {task_id}: {drive_error_message}")
 
-     logger.info(f"Monitoring finished for task {task_id}")
+
+        else:
+            final_message = f"Export {state.lower()}: {error_msg or message}"
+            task_status.update({"state": state, "message": final_message})
+            logger.error(f"Task {task_id} {state}: {error_msg or message}")
+
+    except Exception as e:
+        logger.error(f"Unexpected error monitoring task {task_id}: {str(e)}")
+        task_status.update({"state": "MONITORING_ERROR", "message": f"Unexpected monitoring error: {str(e)}"})
+    finally:
+        await task_statuses.aset(task_id, task_status)
+        _set_future_result(pending.future, task_status)
+        logger.info(f"Monitoring finished for task {task_id}")
+
+async def monitor_export_task(task_id: str, export_name: str, format: str = "GEO_TIFF") -> Dict:
+    """
+    Waits for a GEE export task to finish and returns its final status, including the Drive file.
+    Polling is done by the shared reaper; this only registers the task and awaits its future.
+    """
+    logger.info(f"Monitoring started for task {task_id} ({export_name})")
+    return await _register_task(task_id, EXPORT_MONITOR_TIMEOUT_SECONDS, _export_filename(export_name, format))
 
 
 async def get_task_progress(task_id: str) -> Dict:
-    """Retrieves the current status of an export task from the global dictionary."""
+    """Retrieves the current status of an export task from the shared task status store."""
     # Add filename and file_id to the returned status
-    status = task_statuses.get(task_id)
+    status = await task_statuses.aget(task_id)
     if not status:
         return {"task_id": task_id, "status": "UNKNOWN", "message": "Task ID not found in status tracker."}
 
@@ -542,6 +765,182 @@ async def get_task_progress(task_id: str) -> Dict:
         "filename": status.get("filename") # Useful for caching
     }
 
+# Spectral indices fetch_image_metadata can add: (expression, input bands), keyed by index name
+_INDEX_EXPRESSIONS = {
+    'NDVI': ('(NIR - RED) / (NIR + RED)', ('NIR', 'RED')),
+    'EVI': ('2.5 * ((NIR - RED) / (NIR + 6 * RED - 7.5 * BLUE + 1))', ('NIR', 'RED', 'BLUE')),
+    'NDWI': ('(GREEN - NIR) / (GREEN + NIR)', ('GREEN', 'NIR')),
+}
+
+def _compute_index(image: ee.Image, index: str, band_vars: Optional[Dict[str, ee.Image]] = None) -> Optional[ee.Image]:
+    """
+    Returns the index as a single band named after it, or None for an unknown index.
+    Input bands are taken from band_vars when present (e.g. band math outputs), else selected from image.
+    """
+    name = index.upper()
+    if name not in _INDEX_EXPRESSIONS:
+        return None
+    expression, band_names = _INDEX_EXPRESSIONS[name]
+    band_vars = band_vars or {}
+    variables = {band: band_vars[band] if band in band_vars else image.select(band) for band in band_names}
+    return image.expression(expression, variables).rename(name)
+
+# Zonal statistics reducers by name; unknown names fall back to mean
+_REDUCERS = {
+    'mean': ee.Reducer.mean,
+    'median': ee.Reducer.median,
+    'sum': ee.Reducer.sum,
+    'min': ee.Reducer.min,
+    'max': ee.Reducer.max,
+    'stdDev': ee.Reducer.stdDev,
+}
+
+def _build_reducer(names: Optional[Union[str, List[str]]]) -> ee.Reducer:
+    """
+    Returns the reducer for a name, or for a list of names a single combined reducer
+    (sharedInputs) so every statistic is computed in one pass over the pixels.
+    """
+    if not isinstance(names, (list, tuple)):
+        names = [names]
+    reducers = [_REDUCERS.get(name, ee.Reducer.mean)() for name in names] or [ee.Reducer.mean()]
+    combined = reducers[0]
+    for reducer in reducers[1:]:
+        combined = combined.combine(reducer, sharedInputs=True)
+    return combined
+
+# Export settings used unless the request overrides them
+_EXPORT_DEFAULTS = MappingProxyType({
+    "fileFormat": "GeoTIFF",
+    "folder": "GEE_Images",
+    "maxPixels": 1e13,
+    "crs": "EPSG:4326",
+})
+
+def _make_export_item(
+    vis_image: ee.Image,
+    image_region: ee.Geometry,
+    export_name: str,
+    image_size: int,
+    scale: Optional[int],
+    export_format: Optional[str] = None,
+    export_destination: Optional[str] = None,
+    crs: Optional[str] = None,
+    export_params: Optional[Dict] = None
+) -> Dict:
+    """Builds the export_to_drive arguments (plus the estimated size) for one image."""
+    export_item = {
+        **_EXPORT_DEFAULTS,
+        "image": vis_image,
+        "scale": scale,
+        "region": image_region,
+        "export_name": export_name,
+        "size": image_size, # Estimated size, used for the storage checks
+    }
+    if export_format:
+        export_item["fileFormat"] = export_format
+    if export_destination:
+        export_item["folder"] = export_destination
+    if crs:
+        export_item["crs"] = crs
+
+    # Custom export parameters override the defaults
+    if export_params:
+        if isinstance(export_params, dict):
+            export_item.update(export_params)
+        else:
+            logger.warning(f"Ignoring non-dictionary 'export_params': {type(export_params)}")
+    return export_item
+
+# Custom filter types accepted by fetch_image_metadata
+_PROPERTY_FILTERS = {
+    'eq': ee.Filter.eq,
+    'gt': ee.Filter.gt,
+    'lt': ee.Filter.lt,
+    'gte': ee.Filter.gte,
+    'lte': ee.Filter.lte,
+}
+
+# Image properties fetch_image_metadata reads when detailed metrics are off
+_LISTED_PROPERTIES = ['system:time_start', 'CLOUDY_PIXEL_PERCENTAGE']
+
+def _image_listing(image: ee.Image, all_properties: bool = False) -> ee.Dictionary:
+    """Server-side {'id', 'properties'} entry for an image, shaped like its getInfo() output."""
+    property_names = image.propertyNames() if all_properties else _LISTED_PROPERTIES
+    return ee.Dictionary({'id': image.get('system:id'), 'properties': image.toDictionary(property_names)})
+
+@lru_cache(maxsize=128)
+def _collection_band_names(collection_id: str) -> tuple:
+    """Band names of a collection, taken from its first image. Images in a collection share them."""
+    return tuple(ee.ImageCollection(collection_id).first().bandNames().getInfo())
+
+def _get_download_url(image: ee.Image, params: Dict) -> str:
+    """
+    Requests a download id for the image and builds its URL (what getDownloadURL does, without
+    mutating params). Blocking; run it in a worker thread.
+    """
+    return ee.data.makeDownloadUrl(ee.data.getDownloadId({**params, 'image': image}))
+
+def _start_preview_url(
+    image: ee.Image, vis_params: Dict, region: ee.Geometry, export_dimensions: Any
+) -> asyncio.Task:
+    """
+    Starts getThumbURL for an image's preview in a worker thread and returns the task, so the
+    caller can request the full-resolution URL at the same time instead of one after the other.
+    """
+    preview_params = {
+        **vis_params, # Use the same visualization parameters
+        "region": region,
+        "dimensions": export_dimensions // 4 if isinstance(export_dimensions, int) else 960 # Smaller dimensions for preview
+    }
+    # Use the ORIGINAL (unvisualized) image for getThumbURL, as it's generally more reliable
+    # and doesn't require the potentially large vis_image to be computed twice if URL fails.
+    return asyncio.create_task(asyncio.to_thread(image.getThumbURL, preview_params))
+
+def _fetch_image_summaries(image_ids: List[str]) -> List[Dict]:
+    """
+    Returns the bounds and band names of each image, computed server-side and fetched
+    with a single getInfo() call. Entries are empty dicts if the batch request fails.
+    """
+    if not image_ids:
+        return []
+    summaries = ee.List([
+        ee.Dictionary({'bounds': image.geometry().bounds(), 'bandNames': image.bandNames()})
+        for image in map(ee.Image, image_ids)
+    ])
+    try:
+        return summaries.getInfo()
+    except Exception as e:
+        logger.warning(f"Could not fetch image bounds and bands: {e}")
+        return [{} for _ in image_ids]
+
+def _resolve_deferred_metadata(pending: List[tuple]) -> None:
+    """
+    Fetches the server-side values of (metadata_obj, key, value) entries with a single getInfo()
+    and stores the non-empty ones in their metadata objects. If the batch fails (e.g. a bad
+    histogram band), the bounds are fetched again on their own so they are still returned.
+    """
+    try:
+        values = ee.List([value for _, _, value in pending]).getInfo()
+    except Exception as e:
+        logger.warning(f"Failed to compute histogram/zonal statistics: {e}")
+        pending = [entry for entry in pending if entry[1] == "bounds"]
+        if not pending:
+            return
+        try:
+            values = ee.List([value for _, _, value in pending]).getInfo()
+        except Exception as bounds_error:
+            logger.warning(f"Could not fetch image bounds: {bounds_error}")
+            return
+    for (metadata_obj, key, _), value in zip(pending, values):
+        if value:
+            metadata_obj[key] = value
+
+def _format_image_date(time_start: Optional[int]) -> Optional[str]:
+    """Formats a system:time_start value (ms since epoch, UTC) as YYYY-MM-DD without a GEE round-trip."""
+    if time_start is None:
+        return None
+    return datetime.datetime.fromtimestamp(time_start / 1000, tz=datetime.timezone.utc).strftime("%Y-%m-%d")
+
 async def fetch_image_metadata(
     # Core identification fields
     collection_id: str,
@@ -630,7 +1029,7 @@ async def fetch_image_metadata(
             try:
                 ee_region = ee.Geometry(region) if isinstance(region, (dict, str)) else None
                 if ee_region:
-                    logger.debug(f"🔍 GEE Geometry created: {ee_region.getInfo()}")
+                    logger.debug(f"🔍 GEE Geometry created from region: {region}")
             except Exception as parse_error:
                 logger.warning(f"⚠️ Could not parse region: {region}. Error: {parse_error}")
                 ee_region = None
@@ -646,220 +1045,218 @@ async def fetch_image_metadata(
                 logger.error(f"❌ Error loading image {image_id}: {str(img_error)}")
                 raise ValueError(f"Invalid image ID: {image_id}")
         else:
-            # Filter image collection
-            collection = ee.ImageCollection(collection_id)
+            # Collect every filter and apply them as a single ee.Filter.And
+            collection_filters = []
             
             # Apply temporal filters if specified
             if start_date and end_date:
-                collection = collection.filterDate(start_date, end_date)
+                collection_filters.append(ee.Filter.date(start_date, end_date))
             
             # Apply spatial filters if specified
             if ee_region:
-                collection = collection.filterBounds(ee_region)
+                collection_filters.append(ee.Filter.bounds(ee_region))
             
             # Apply cloud cover filter if specified
             if max_cloud_cover is not None:
-                collection = collection.filter(ee.Filter.lt("CLOUDY_PIXEL_PERCENTAGE", max_cloud_cover))
+                collection_filters.append(ee.Filter.lt("CLOUDY_PIXEL_PERCENTAGE", max_cloud_cover))
             
             # Apply additional custom filters if specified
-            if filters:
-                for filter_item in filters:
-                    filter_type = filter_item.get('type')
-                    property_name = filter_item.get('property')
-                    value = filter_item.get('value')
-                    
-                    if not all([filter_type, property_name, value is not None]):
-                        logger.warning(f"Skipping invalid filter: {filter_item}")
-                        continue
-                    
-                    if filter_type == 'eq':
-                        collection = collection.filter(ee.Filter.eq(property_name, value))
-                    elif filter_type == 'gt':
-                        collection = collection.filter(ee.Filter.gt(property_name, value))
-                    elif filter_type == 'lt':
-                        collection = collection.filter(ee.Filter.lt(property_name, value))
-                    elif filter_type == 'gte':
-                        collection = collection.filter(ee.Filter.gte(property_name, value))
-                    elif filter_type == 'lte':
-                        collection = collection.filter(ee.Filter.lte(property_name, value))
-                    else:
-                        logger.warning(f"Unsupported filter type: {filter_type}")
+            for filter_item in filters or []:
+                filter_type = filter_item.get('type')
+                property_name = filter_item.get('property')
+                value = filter_item.get('value')
+                
+                if not all([filter_type, property_name, value is not None]):
+                    logger.warning(f"Skipping invalid filter: {filter_item}")
+                    continue
+                
+                property_filter = _PROPERTY_FILTERS.get(filter_type)
+                if property_filter is None:
+                    logger.warning(f"Unsupported filter type: {filter_type}")
+                    continue
+                collection_filters.append(property_filter(property_name, value))
             
-            # Get images list
+            collection = ee.ImageCollection(collection_id)
+            if collection_filters:
+                collection = collection.filter(ee.Filter.And(*collection_filters))
+            
+            # Get images list. Only the id and the needed properties are returned, not the
+            # band metadata and footprint geometry of every image.
             images_count = images_number if images_number is not None else 10
-            images = collection.toList(images_count).getInfo()
+            images = collection.toList(images_count).map(
+                lambda image: _image_listing(ee.Image(image), all_properties=detailed_metrics)
+            ).getInfo()
             logger.debug(f"🔍 Images retrieved: {len(images)} images found")
         
         # Process images
         processed_images = []
+        pending_metadata = []  # (metadata_obj, key, server-side value) fetched together after the loop
         images_to_export = []
         total_export_size = 0
         
-        # Handle visualization parameters
-        vis_params = visualization_params.copy() if visualization_params else {}
-        # Only set default bands if not specified, but respect user input
-        if "bands" not in vis_params and selected_bands:
-            vis_params["bands"] = selected_bands[:min(3, len(selected_bands))]
-        if "min" not in vis_params:
-            vis_params["min"] = min_value
-        if "max" not in vis_params:
-            vis_params["max"] = max_value
-        logger.debug(f"Visualization params: {vis_params}")
-
+        # Base visualization parameters, built once and only read inside the loop. User input
+        # wins; bands are filled in per image when not specified.
+        base_vis_params = {"min": min_value, "max": max_value, **(visualization_params or {})}
+        logger.debug(f"Visualization params: {base_vis_params}")
+
+        # Images of a collection share their band names, so those are looked up once per collection
+        collection_bands = None
+        if not image_id and images:
+            try:
+                collection_bands = _collection_band_names(collection_id)
+            except Exception as e:
+                logger.warning(f"Could not get band names of {collection_id}, reading them per image: {e}")
+
+        # Band names are only needed per image when neither the request nor the collection gives
+        # them; they are fetched up front (with the bounds) for all images in one round-trip.
+        # Otherwise the bounds are deferred and fetched with the statistics after the loop.
+        if collection_bands is None and not bands:
+            image_summaries = _fetch_image_summaries([image_info['id'] for image_info in images])
+        else:
+            image_summaries = [{} for _ in images]
 
-        
         # Handle dimensions for export
         export_dimensions = dimensions
         if isinstance(dimensions, dict):
             # If dimensions is a dict, extract width for exports
             export_dimensions = dimensions.get('width', 3840)
         
-        # Process each image
-        Image_Number = 0
-        for image_info in images:
-            logger.info(f"🔍 Processing image number: {Image_Number + 1}")
-            Image_Number += 1
+        # The DEM derivatives and reducers are the same for every image, so build them once.
+        # Terrain bands are a single image added to each image in the loop.
+        terrain_image = None
+        terrain_band_names = []
+        if dem_collection and terrain_params:
+            try:
+                dem = ee.Image(dem_collection)
+                terrain_bands = []
+                if terrain_params.get('slope'):
+                    terrain_bands.append(ee.Terrain.slope(dem).rename('slope'))
+                    terrain_band_names.append('slope')
+                if terrain_params.get('aspect'):
+                    terrain_bands.append(ee.Terrain.aspect(dem).rename('aspect'))
+                    terrain_band_names.append('aspect')
+                if terrain_params.get('hillshade'):
+                    azimuth = terrain_params.get('azimuth', 315)
+                    altitude = terrain_params.get('altitude', 45)
+                    terrain_bands.append(ee.Terrain.hillshade(dem, azimuth, altitude).rename('hillshade'))
+                    terrain_band_names.append('hillshade')
+                if terrain_bands:
+                    terrain_image = ee.Image.cat(terrain_bands)
+            except Exception as terrain_error:
+                logger.warning(f"Failed to apply terrain analysis: {terrain_error}")
+                terrain_band_names = []
+
+        hist_reducer = None
+        if histogram_params:
+            hist_reducer = ee.Reducer.histogram(
+                histogram_params.get('bins', 50),
+                histogram_params.get('min', min_value),
+                histogram_params.get('max', max_value)
+            )
+
+        stat_reducer = None
+        if zonal_stats and feature_collection_id:
+            feature_collection = ee.FeatureCollection(feature_collection_id)
+            stat_reducer = _build_reducer(zonal_stats.get('reducer'))
+
+        # Process each image. This only builds the server-side images and starts their URL
+        # requests; the URLs of all images are collected after the loop so their round-trips overlap.
+        url_requests = []  # (metadata_obj, vis_image, image_region, download_task, preview_task)
+        for Image_Number, (image_info, image_summary) in enumerate(zip(images, image_summaries), start=1):
+            logger.info(f"🔍 Processing image number: {Image_Number}")
 
             ee_image = ee.Image(image_info['id'])
-            image_geometry = ee_image.geometry()
-            image_region = ee_region if ee_region else image_geometry
-
-            try:
-                bounds_info = image_geometry.bounds().getInfo()
-            except Exception as geom_error:
-                logger.warning(f"Could not get geometry info: {geom_error}")
-                bounds_info = None
+            image_region = ee_region if ee_region else ee_image.geometry()
 
             # Initialize response variables
-            full_res_url = None
-            preview_url = None
+            preview_task = None
+            download_task = None
+            ee_image_selected = None
+            vis_params = base_vis_params
+            vis_image = None
             export_info = None
-            image_size = 0
             analysis_results = {}
             histogram_results = None
             zonal_stats_results = None
 
             try:
                 # Select bands if specified
-                selected_bands = bands if bands else ee_image.bandNames().getInfo()
+                # Copied, since derived bands are appended to it below
+                available_bands = collection_bands or image_summary.get('bandNames') or ee_image.bandNames().getInfo()
+                selected_bands = list(bands) if bands else list(available_bands)
                 ee_image_selected = ee_image.select(selected_bands)
                 logger.debug(f"Selected bands: {selected_bands}")
 
+                # Validate the requested bands against the already-fetched band names
+                if bands:
+                    available_set = set(available_bands)
+                    missing_bands = [band for band in selected_bands if band not in available_set]
+                    if missing_bands:
+                        logger.warning(f"Bands {missing_bands} not found in image {image_info['id']}")
+
+                # Band math and the index share one set of band variables (later expressions can use
+                # earlier outputs) and are added to the image together with a single addBands
+                band_vars = {band: ee_image_selected.select(band) for band in selected_bands}
+                derived_bands = []
+
                 # Apply band math if specified
-                available_bands = ee_image_selected.bandNames().getInfo()
-                for band in selected_bands:
-                    if band not in available_bands:
-                        logger.warning(f"Band '{band}' not found in image {image_info['id']}")
                 if band_math:
                     for new_band_name, expression in band_math.items():
                         try:
                             # Explicitly map bands to variables in the expression
-                            band_map = {band: ee_image_selected.select(band) for band in selected_bands if band in expression}
+                            band_map = {band: var for band, var in band_vars.items() if band in expression}
                             logger.debug(f"Band map for '{new_band_name}': {list(band_map.keys())}")
                             computed_band = ee_image_selected.expression(expression, band_map).rename(new_band_name)
-                            ee_image_selected = ee_image_selected.addBands(computed_band)
+                            band_vars[new_band_name] = computed_band
+                            derived_bands.append(computed_band)
                             selected_bands.append(new_band_name)
-                            logger.debug(f"Added '{new_band_name}' to image. Bands now: {ee_image_selected.bandNames().getInfo()}")
+                            logger.debug(f"Added '{new_band_name}' to image. Bands now: {selected_bands}")
                         except Exception as band_math_error:
                             logger.warning(f"Failed to compute band math '{new_band_name}': {str(band_math_error)}")
                 # Compute index if specified
                 if index:
-                    index_band = None
                     try:
-                        if index.upper() == 'NDVI':
-                            index_band = ee_image_selected.normalizedDifference(['NIR', 'RED']).rename('NDVI')
-                        elif index.upper() == 'EVI':
-                            index_band = ee_image_selected.expression(
-                                '2.5 * ((NIR - RED) / (NIR + 6 * RED - 7.5 * BLUE + 1))',
-                                {
-                                    'NIR': ee_image_selected.select('NIR'),
-                                    'RED': ee_image_selected.select('RED'),
-                                    'BLUE': ee_image_selected.select('BLUE')
-                                }
-                            ).rename('EVI')
-                        elif index.upper() == 'NDWI':
-                            index_band = ee_image_selected.normalizedDifference(['GREEN', 'NIR']).rename('NDWI')
-                        
+                        index_band = _compute_index(ee_image_selected, index, band_vars)
                         if index_band:
-                            ee_image_selected = ee_image_selected.addBands(index_band)
-                            # Add index to selected bands and visualization if it doesn't include bands
-                            selected_bands.append(index)
-                            if "bands" not in visualization_params:
-                                visualization_params["bands"] = [index]
+                            derived_bands.append(index_band)
+                            # Add index to selected bands (and visualization, below)
+                            selected_bands.append(index.upper())
                             analysis_results[index] = True
                     except Exception as index_error:
                         logger.warning(f"Failed to compute index {index}: {index_error}")
                         analysis_results[index] = False
+
+                if derived_bands:
+                    ee_image_selected = ee_image_selected.addBands(ee.Image.cat(derived_bands))
                 
-                # Apply terrain analysis if dem_collection is specified
-                if dem_collection and terrain_params:
-                    try:
-                        dem = ee.Image(dem_collection)
-                        if 'slope' in terrain_params and terrain_params['slope']:
-                            slope = ee.Terrain.slope(dem)
-                            ee_image_selected = ee_image_selected.addBands(slope.rename('slope'))
-                            selected_bands.append('slope')
-                        if 'aspect' in terrain_params and terrain_params['aspect']:
-                            aspect = ee.Terrain.aspect(dem)
-                            ee_image_selected = ee_image_selected.addBands(aspect.rename('aspect'))
-                            selected_bands.append('aspect')
-                        if 'hillshade' in terrain_params and terrain_params['hillshade']:
-                            azimuth = terrain_params.get('azimuth', 315)
-                            altitude = terrain_params.get('altitude', 45)
-                            hillshade = ee.Terrain.hillshade(dem, azimuth, altitude)
-                            ee_image_selected = ee_image_selected.addBands(hillshade.rename('hillshade'))
-                            selected_bands.append('hillshade')
-                    except Exception as terrain_error:
-                        logger.warning(f"Failed to apply terrain analysis: {terrain_error}")
+                # Add the precomputed terrain bands
+                if terrain_image is not None:
+                    ee_image_selected = ee_image_selected.addBands(terrain_image)
+                    selected_bands.extend(terrain_band_names)
                 
-                # Apply histogram analysis if specified
-                if histogram_params:
-                    try:
-                        hist_band = histogram_params.get('band', selected_bands[0])
-                        hist_bins = histogram_params.get('bins', 50)
-                        hist_min = histogram_params.get('min', min_value)
-                        hist_max = histogram_params.get('max', max_value)
-                        
-                        histogram = ee_image_selected.select(hist_band).reduceRegion(
-                            reducer=ee.Reducer.histogram(hist_bins, hist_min, hist_max),
-                            geometry=image_region,
-                            scale=scale,
-                            maxPixels=1e9
-                        ).getInfo()
-                        
-                        histogram_results = histogram
-                    except Exception as hist_error:
-                        logger.warning(f"Failed to compute histogram: {hist_error}")
+                # Histogram and zonal statistics are only returned with detailed metrics. They stay
+                # server-side here and are fetched for all images in one request after the loop.
+                if hist_reducer is not None and detailed_metrics:
+                    hist_band = histogram_params.get('band', selected_bands[0])
+                    histogram_results = ee_image_selected.select(hist_band).reduceRegion(
+                        reducer=hist_reducer,
+                        geometry=image_region,
+                        scale=scale,
+                        maxPixels=1e9
+                    )
                 
-                # Apply zonal statistics if specified
-                if zonal_stats and feature_collection_id:
-                    try:
-                        feature_collection = ee.FeatureCollection(feature_collection_id)
-                        stat_reducer = ee.Reducer.mean()
-                        if zonal_stats.get('reducer') == 'mean':
-                            stat_reducer = ee.Reducer.mean()
-                        elif zonal_stats.get('reducer') == 'median':
-                            stat_reducer = ee.Reducer.median()
-                        elif zonal_stats.get('reducer') == 'sum':
-                            stat_reducer = ee.Reducer.sum()
-                        elif zonal_stats.get('reducer') == 'min':
-                            stat_reducer = ee.Reducer.min()
-                        elif zonal_stats.get('reducer') == 'max':
-                            stat_reducer = ee.Reducer.max()
-                        
-                        zonal_stats_results = ee_image_selected.select(selected_bands).reduceRegions(
-                            collection=feature_collection,
-                            reducer=stat_reducer,
-                            scale=scale
-                        ).getInfo()
-                    except Exception as zonal_error:
-                        logger.warning(f"Failed to compute zonal statistics: {zonal_error}")
+                if stat_reducer is not None and detailed_metrics:
+                    zonal_stats_results = ee_image_selected.select(selected_bands).reduceRegions(
+                        collection=feature_collection,
+                        reducer=stat_reducer,
+                        scale=scale
+                    )
                 
-                # Prepare visualization parameters
-                vis_params = visualization_params.copy()
-                if "bands" not in vis_params and selected_bands:
-                    # Use first three bands or fewer if less available
-                    vis_params["bands"] = selected_bands[:min(3, len(selected_bands))]
+                # Prepare visualization parameters: show the computed index, else the first
+                # three bands (or fewer if less available), unless the user chose bands
+                if "bands" not in base_vis_params and selected_bands:
+                    vis_bands = [index.upper()] if analysis_results.get(index) else selected_bands[:3]
+                    vis_params = {**base_vis_params, "bands": vis_bands}
                 
                 # Visualize image for high-res rendering
                 try:
@@ -880,122 +1277,30 @@ async def fetch_image_metadata(
                         raise ValueError(f"Invalid CRS format: {crs}")
                     download_params["crs"] = crs
 
-                full_res_url = vis_image.getDownloadURL(download_params)
+                # ✅ Thumbnail preview and high-res download URL, requested in worker threads
+                preview_task = _start_preview_url(ee_image_selected, vis_params, image_region, export_dimensions)
+                download_task = asyncio.create_task(asyncio.to_thread(_get_download_url, vis_image, download_params))
 
-                # ✅ Thumbnail preview
-                preview_dimensions = export_dimensions // 4 if isinstance(export_dimensions, int) else 960
-                preview_url = ee_image_selected.getThumbURL({
-                    **vis_params,
-                    "region": image_region,
-                    "dimensions": preview_dimensions
-                })
+            except Exception as build_error:
+                logger.error(f"❌ Unexpected error preparing {image_info['id']} for download: {build_error}")
 
-            except ee.EEException as img_error:
-                error_str = str(img_error)
-                logger.warning(f"Could not generate direct download URL for {image_info['id']}: {error_str}")
-
-                size_match = re.search(r'Total request size \((\d+) bytes\)', error_str)
-                # Check if it's the size limit error AND we have a visualized image
-                if size_match and "must be less than or equal to" in error_str and 'vis_image' in locals():
-                    image_size = int(size_match.group(1)) # Store the estimated size
-                    logger.info(f"Image {image_info['id']} estimated size {image_size / 1024 / 1024:.2f} MB exceeds direct download limit.")
-
-                    logger.info("Checking if exporting is allowed based on storage...")
-                    if can_export: # Check if exporting is allowed based on storage
-                        total_export_size += image_size # Add to total potential export size
-                        logger.info(f"test2 {total_export_size}")
-
-                            # --->>> ADD THIS LOGGING <<<---
-                        logger.debug(f"Checking state BEFORE 'if can_export'. Type(total_export_size): {type(total_export_size)}, Value: {total_export_size}")
-                        logger.debug(f"Checking state BEFORE 'if can_export'. Type(image_size): {type(image_size)}, Value: {image_size}")
-                        logger.debug(f"Checking state BEFORE 'if can_export'. Value(can_export): {can_export}")
-                        # --->>> END OF ADDED LOGGING <<<---
-
-                        # Prepare item for export using the VISUALIZED image
-                        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                        safe_image_id = image_info['id'].replace('/', '_')
-                        export_name = f"{place_name}_{safe_image_id}_{timestamp}" if place_name else f"metadata_export_{safe_image_id}_{timestamp}"
-
-                        # --- Prepare export_item dictionary ---
-                        export_item = {
-                            "image": vis_image,          # <--- KEY CHANGE: Use the visualized image
-                            "scale": scale,              # Use the requested scale
-                            "region": image_region,      # Use the relevant region
-                            "export_name": export_name,
-                            "size": image_size,          # Store estimated size for checks
-                            # --- Pass export configurations ---
-                            "fileFormat": export_format if export_format else "GeoTIFF", # Use requested or default
-                            "folder": export_destination if export_destination else "GEE_Images", # Specify folder
-                            "maxPixels": 1e13, # Default, consider making configurable
-                            # Add CRS if specified for the export
-                            "crs": crs if crs else "EPSG:4326"
-                        }
-
-                        # Add custom export parameters if provided, potentially overriding defaults
-                        if export_params:
-                           export_item.update(export_params) # Merge/override with user-defined export params
-
-                        images_to_export.append(export_item)
-                        logger.info(f"Queued {image_info['id']} for Drive export as '{export_name}.{export_item['fileFormat']}'")
-                        full_res_url = None # Ensure URL is None as we are exporting instead
-                    else:
-                        logger.warning(f"Image {image_info['id']} too large for download, but export skipped (insufficient storage or export disabled).")
-                        full_res_url = None # No URL if too large and not exporting
-                else:
-                     # Handle other GEE errors during URL generation if necessary
-                     logger.warning(f"Non-size related EEException during URL generation for {image_info['id']}: {error_str}")
-                     full_res_url = None # No URL on other errors either
-
-            except Exception as url_gen_error:
-                 logger.error(f"❌ Unexpected error generating download URL for {image_info['id']}: {url_gen_error}")
-                 full_res_url = None # Ensure URL is None on unexpected errors
-
-
-            # ✅ Thumbnail preview (should still work even if full-res is too large)
-            preview_url = None
-            try:
-                preview_dimensions = export_dimensions // 4 if isinstance(export_dimensions, int) else 960 # Smaller dimensions for preview
-                preview_params = {
-                    **vis_params, # Use the same visualization parameters
-                    "region": image_region,
-                    "dimensions": preview_dimensions
-                }
-                # Use the ORIGINAL ee_image_selected for getThumbURL, as it's generally more reliable
-                # and doesn't require the potentially large vis_image to be computed twice if URL fails.
-                preview_url = ee_image_selected.getThumbURL(preview_params)
-            except Exception as thumb_err:
-                logger.warning(f"⚠️ Could not generate preview thumbnail for {image_info['id']}: {thumb_err}")
-
-            # Download and encode preview image if URL was generated
-            if preview_url:
+            # ✅ Thumbnail preview (should still work even if the image could not be prepared for download)
+            if preview_task is None and ee_image_selected is not None:
                 try:
-                    response = requests.get(preview_url, timeout=30) # Added timeout
-                    response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-                    if response.status_code == 200:
-                        logger.debug(f"Successfully downloaded and encoded preview for {image_info['id']}")
-                    else:
-                        logger.warning(f"Failed to download preview image for {image_info['id']}. Status code: {response.status_code}")
-                except requests.exceptions.RequestException as req_err:
-                    logger.warning(f"⚠️ Request failed for preview thumbnail {image_info['id']}: {req_err}")
-                except Exception as enc_err:
-                     logger.warning(f"⚠️ Error encoding preview image for {image_info['id']}: {enc_err}")
-
-                # Correctly indented except block for the outer try/except handling general image processing errors
-                except Exception as other_error:
-                    logger.error(f"Unexpected error during processing for {image_info['id']}: {other_error}")
-                    # Ensure essential metadata fields are still populated even on error
-                    bounds_info = bounds_info if 'bounds_info' in locals() else None # Keep bounds if already fetched
+                    preview_task = _start_preview_url(ee_image_selected, vis_params, image_region, export_dimensions)
+                except Exception as thumb_err:
+                    logger.warning(f"⚠️ Could not generate preview thumbnail for {image_info['id']}: {thumb_err}")
 
             # Build metadata object (this was already correctly placed outside the inner try/except)
             metadata_obj = {
                 "id": image_info["id"],
-                "date": ee.Date(image_info["properties"]["system:time_start"]).format("YYYY-MM-dd").getInfo(),
+                "date": _format_image_date(image_info["properties"].get("system:time_start")),
                 "cloudCover": image_info["properties"].get("CLOUDY_PIXEL_PERCENTAGE", None),
-                "bounds": bounds_info,
-                "fullResUrl": full_res_url,
-                "previewUrl": preview_url, # Keep the URL for reference if needed
+                "bounds": image_summary.get('bounds'),
+                "fullResUrl": None, # URLs and the estimated size are filled in after the loop
+                "previewUrl": None, # Keep the URL for reference if needed
                 "exportInfo": export_info,
-                "size": image_size
+                "size": 0
             }
             
             # Add detailed metrics if requested
@@ -1003,12 +1308,68 @@ async def fetch_image_metadata(
                 metadata_obj["properties"] = image_info["properties"]
                 if analysis_results:
                     metadata_obj["analysisResults"] = analysis_results
-                if histogram_results:
-                    metadata_obj["histogram"] = histogram_results
-                if zonal_stats_results:
-                    metadata_obj["zonalStats"] = zonal_stats_results
+                if histogram_results is not None:
+                    pending_metadata.append((metadata_obj, "histogram", histogram_results))
+                if zonal_stats_results is not None:
+                    pending_metadata.append((metadata_obj, "zonalStats", zonal_stats_results))
             
+            if 'bounds' not in image_summary:
+                pending_metadata.append((metadata_obj, "bounds", ee_image.geometry().bounds()))
             processed_images.append(metadata_obj)
+            url_requests.append((metadata_obj, vis_image, image_region, download_task, preview_task))
+
+        # Collect the URLs in image order; a download that is too large is queued for Drive export
+        for metadata_obj, vis_image, image_region, download_task, preview_task in url_requests:
+            image_id = metadata_obj["id"]
+            if download_task is not None:
+                try:
+                    metadata_obj["fullResUrl"] = await download_task
+                except ee.EEException as img_error:
+                    error_str = str(img_error)
+                    logger.warning(f"Could not generate direct download URL for {image_id}: {error_str}")
+
+                    size_match = _REQUEST_SIZE_RE.search(error_str)
+                    if size_match and _SIZE_LIMIT_MESSAGE in error_str:
+                        image_size = int(size_match.group(1)) # Store the estimated size
+                        metadata_obj["size"] = image_size
+                        logger.info(f"Image {image_id} estimated size {image_size / 1024 / 1024:.2f} MB exceeds direct download limit.")
+
+                        if can_export: # Check if exporting is allowed based on storage
+                            total_export_size += image_size # Add to total potential export size
+
+                            # Prepare item for export using the VISUALIZED image
+                            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+                            safe_image_id = image_id.replace('/', '_')
+                            export_name = f"{place_name}_{safe_image_id}_{timestamp}" if place_name else f"metadata_export_{safe_image_id}_{timestamp}"
+
+                            # Export the visualized image so the file matches the getDownloadURL output
+                            export_item = _make_export_item(
+                                vis_image, image_region, export_name, image_size, scale,
+                                export_format=export_format, export_destination=export_destination,
+                                crs=crs, export_params=export_params
+                            )
+                            images_to_export.append(export_item)
+                            logger.info(f"Queued {image_id} for Drive export as '{export_name}.{export_item['fileFormat']}'")
+                        else:
+                            logger.warning(f"Image {image_id} too large for download, but export skipped (insufficient storage or export disabled).")
+                    else:
+                        # Handle other GEE errors during URL generation if necessary
+                        logger.warning(f"Non-size related EEException during URL generation for {image_id}: {error_str}")
+                except Exception as url_gen_error:
+                    logger.error(f"❌ Unexpected error generating download URL for {image_id}: {url_gen_error}")
+
+            if preview_task is not None:
+                try:
+                    preview_url = await preview_task
+                except Exception as thumb_err:
+                    logger.warning(f"⚠️ Could not generate preview thumbnail for {image_id}: {thumb_err}")
+                else:
+                    # Only the URL is returned; clients fetch the thumbnail themselves
+                    metadata_obj["previewUrl"] = preview_url
+
+        # Fetch the deferred bounds, histograms and zonal statistics of every image in a single getInfo()
+        if pending_metadata:
+            _resolve_deferred_metadata(pending_metadata)
 
         # Handle exports
         if can_export and total_export_size > available_storage:
@@ -1017,52 +1378,7 @@ async def fetch_image_metadata(
             can_export = False # Prevent export initiation
 
         export_results = [] # To store results from export_to_drive calls
-        if can_export:
-                        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                        safe_image_id = image_info['id'].replace('/', '_')
-                        base_export_name = place_name if place_name else "metadata_export"
-                        export_name = f"{base_export_name}_{safe_image_id}_{timestamp}"
-                        try:
-                            # Step 1: Create dict with only standard types (NO float, NO GEE objects yet)
-                            export_item = {
-                                "export_name": export_name,
-                                "size": image_size,
-                                "scale": scale,
-                                "fileFormat": export_format if export_format else "GeoTIFF",
-                                "folder": export_destination if export_destination else "GEE_Images",
-                            }
-
-                            # Step 2: Add the float
-                            export_item["maxPixels"] = 1e13
-
-                            # Step 3: Add CRS (standard type)
-                            if crs:
-                                export_item["crs"] = crs
-
-                            # Step 4: Add GEE Geometry object
-                            export_item["region"] = image_region
-
-                            # Step 5: Add GEE Image object
-                            export_item["image"] = vis_image
-
-                            # Step 6: Handle export_params (Dictionary update)
-                            if export_params:
-                                if isinstance(export_params, dict):
-                                    export_item.update(export_params)
-                                else:
-                                    logger.warning(f"Ignoring non-dictionary 'export_params': {type(export_params)}")
 
-                            images_to_export.append(export_item)
-                        except Exception as diag_error:
-                            raise # Re-raise to see traceback
-
-                        full_res_url = None # Set outside block
-                        
-        else:
-            logger.warning(f"Non-size related EEException during URL generation for {image_info['id']}: {error_str}")
-            full_res_url = None
-    
-        
         # Prepare result
         result = {
         "images": processed_images,
@@ -1085,14 +1401,14 @@ async def fetch_image_metadata(
         if temporal_analysis and start_date and end_date:
             try:
                 # Include some statistics about the temporal range
+                start_dt = datetime.datetime.strptime(start_date, "%Y-%m-%d")
+                end_dt = datetime.datetime.strptime(end_date, "%Y-%m-%d")
+                total_days = (end_dt - start_dt).days
                 date_range = {
                     "startDate": start_date,
                     "endDate": end_date,
-                    "totalDays": (datetime.datetime.strptime(end_date, "%Y-%m-%d") - 
-                                 datetime.datetime.strptime(start_date, "%Y-%m-%d")).days,
-                    "imageFrequency": (datetime.datetime.strptime(end_date, "%Y-%m-%d") - 
-                                      datetime.datetime.strptime(start_date, "%Y-%m-%d")).days / 
-                                      max(len(processed_images), 1)
+                    "totalDays": total_days,
+                    "imageFrequency": total_days / max(len(processed_images), 1)
                 }
                 result["temporalAnalysis"] = date_range
             except Exception as date_error:
@@ -1,12 +1,17 @@
 import ee
+import asyncio
 import logging
 from typing import Union, Dict, List, Optional
-from gee_app.utils.sensor_utils import get_sensor_type,parse_region
+from gee_app.utils.sensor_utils import get_sensor_type, sensor_from_id, parse_region
 
+from gee_app.utils.cache_utils import _generate_cache_key, get_cached_data_by_key, store_data_with_key
 from .ee_utils import  get_image_urls
 
 logger = logging.getLogger('gee_app')
 
+# Monthly means only change as new scenes are ingested, so computed series are reused for a day
+TIME_SERIES_CACHE_TTL = 86400
+
 # --------------------------------------------
 # General Utility Functions
 # Suggested file: gee_utils.py
@@ -22,6 +27,13 @@ def validate_gee_asset(asset_id: str) -> bool:
         logger.warning(f"Invalid GEE asset {asset_id}: {str(e)}")
         return False
 
+async def validate_gee_assets(asset_ids: List[str]) -> List[bool]:
+    """
+    Validates several GEE assets concurrently, one worker thread per asset.
+    Results are returned in the same order as asset_ids.
+    """
+    return list(await asyncio.gather(*(asyncio.to_thread(validate_gee_asset, asset_id) for asset_id in asset_ids)))
+
 async def load_image_or_collection(id: str, is_collection: bool = False, region: Optional[Union[str, Dict]] = None, bands: Optional[List[str]] = None) -> Union[ee.Image, ee.ImageCollection]:
     """
     Loads an image or image collection, optionally clipping to a region and selecting specific bands.
@@ -40,53 +52,51 @@ async def load_image_or_collection(id: str, is_collection: bool = False, region:
         data = data.select(bands)
     return data
 
-def compute_index(image: ee.Image, index: str) -> ee.Image:
+# Bands used for each index, keyed by the sensor labels returned by get_sensor_type.
+# NDVI/NDWI entries are normalizedDifference pairs; EVI entries are (NIR, RED, BLUE).
+_INDEX_BANDS = {
+    'LANDSAT_8': {'NDVI': ['B5', 'B4'], 'EVI': ('B5', 'B4', 'B2'), 'NDWI': ['B3', 'B5']},
+    'LANDSAT_7_5': {'NDVI': ['B4', 'B3'], 'EVI': ('B4', 'B3', 'B1'), 'NDWI': ['B2', 'B4']},
+    'SENTINEL-2': {'NDVI': ['B8', 'B4'], 'EVI': ('B8', 'B4', 'B2'), 'NDWI': ['B3', 'B8']},
+}
+
+def resolve_sensor(image: ee.Image) -> str:
     """
-    Computes a specified index (NDVI, EVI, NDWI) based on the sensor type.
+    Resolves the sensor of an image with a single server round-trip.
+    Call this once per image or collection and pass the result to compute_index.
     """
     try:
         # Get the full image ID (e.g., 'COPERNICUS/S2/20210223T102929_20210223T103716_T32TMT')
         image_id = image.get('system:id').getInfo() or image.id().getInfo()
         sensor = get_sensor_type(image_id)
-        logger.debug(f"Detected sensor: {sensor} for image {image_id}")
+        logger.debug("Detected sensor: %s for image %s", sensor, image_id)
     except Exception as e:
-        logger.warning(f"Failed to detect sensor: {str(e)}. Defaulting to Sentinel-2.")
+        logger.warning("Failed to detect sensor: %s. Defaulting to Sentinel-2.", e)
         sensor = 'SENTINEL-2'  # Fallback for your case
+    return sensor
 
-    if index == 'NDVI':
-        if sensor == 'LANDSAT_8':
-            return image.normalizedDifference(['B5', 'B4']).rename('NDVI')
-        elif sensor == 'LANDSAT_7_5':
-            return image.normalizedDifference(['B4', 'B3']).rename('NDVI')
-        elif sensor == 'SENTINEL-2':
-            return image.normalizedDifference(['B8', 'B4']).rename('NDVI')
-    elif index == 'EVI':
-        if sensor == 'LANDSAT_8':
-            return image.expression(
-                '2.5 * ((NIR - RED) / (NIR + 6 * RED - 7.5 * BLUE + 1))',
-                {'NIR': image.select('B5'), 'RED': image.select('B4'), 'BLUE': image.select('B2')}
-            ).rename('EVI')
-        elif sensor == 'LANDSAT_7_5':
-            return image.expression(
-                '2.5 * ((NIR - RED) / (NIR + 6 * RED - 7.5 * BLUE + 1))',
-                {'NIR': image.select('B4'), 'RED': image.select('B3'), 'BLUE': image.select('B1')}
-            ).rename('EVI')
-        elif sensor == 'SENTINEL-2':
-            return image.expression(
-                '2.5 * ((NIR - RED) / (NIR + 6 * RED - 7.5 * BLUE + 1))',
-                {'NIR': image.select('B8'), 'RED': image.select('B4'), 'BLUE': image.select('B2')}
-            ).rename('EVI')
-    elif index == 'NDWI':
-        if sensor == 'LANDSAT_8':
-            return image.normalizedDifference(['B3', 'B5']).rename('NDWI')
-        elif sensor == 'LANDSAT_7_5':
-            return image.normalizedDifference(['B2', 'B4']).rename('NDWI')
-        elif sensor == 'SENTINEL-2':
-            return image.normalizedDifference(['B3', 'B8']).rename('NDWI')
-    else:
+def compute_index(image: ee.Image, index: str, sensor: Optional[str] = None) -> ee.Image:
+    """
+    Computes a specified index (NDVI, EVI, NDWI) based on the sensor type.
+    Pass `sensor` when it is already known; it is required inside collection.map(),
+    where the image cannot be inspected client-side.
+    """
+    if sensor is None:
+        sensor = resolve_sensor(image)
+
+    if index not in ('NDVI', 'EVI', 'NDWI'):
         raise ValueError(f"Index {index} not supported for sensor {sensor}")
-    
-    raise ValueError(f"Failed to compute {index} for sensor {sensor}")
+    bands = _INDEX_BANDS.get(sensor, {}).get(index)
+    if bands is None:
+        raise ValueError(f"Failed to compute {index} for sensor {sensor}")
+
+    if index == 'EVI':
+        nir, red, blue = bands
+        return image.expression(
+            '2.5 * ((NIR - RED) / (NIR + 6 * RED - 7.5 * BLUE + 1))',
+            {'NIR': image.select(nir), 'RED': image.select(red), 'BLUE': image.select(blue)}
+        ).rename('EVI')
+    return image.normalizedDifference(bands).rename(index)
 
 def apply_threshold(image: ee.Image, band: str, threshold: float, comparison: str = 'gt') -> ee.Image:
     """
@@ -124,59 +134,86 @@ async def terrain_analysis(dem_collection: str, analysis_type: str, region: Opti
     
     return await get_image_urls(result, aoi, [analysis_type], scale, analysis_type.capitalize(), place_name)
 
-async def detect_features(image_id: str, region: Optional[Union[str, Dict]], detection_type: str, threshold: float, scale: int = 30, place_name: Optional[str] = None) -> Dict:
+# Thermal (or SWIR, for Sentinel-2) bands used for fire hotspot detection; multiple bands are averaged
+_THERMAL_BANDS = {
+    'LANDSAT_8': ['B10'],
+    'LANDSAT_7_5': ['B6_VCID_1', 'B6_VCID_2'],
+    'SENTINEL-2': ['B11'],
+}
+
+async def detect_features(image_id: str, region: Optional[Union[str, Dict]], detection_type: str, threshold: float, scale: int = 30, place_name: Optional[str] = None, sensor: Optional[str] = None) -> Dict:
     """
     General function for feature detection (e.g., fire hotspots, water bodies).
+    Pass `sensor` when the caller already knows it to skip sensor detection.
     """
     image = await load_image_or_collection(image_id, region=region)
     aoi = parse_region(region) if region else image.geometry()
+    sensor = sensor or get_sensor_type(image_id)
+    mask_band = f"{detection_type}_mask"
     
     if detection_type == 'fire_hotspots':
-        sensor = get_sensor_type(image_id)
-        if sensor == 'LANDSAT_8':
-            thermal = image.select('B10')
-        elif sensor == 'LANDSAT_7_5':
-            thermal_bands = ['B6_VCID_1', 'B6_VCID_2']
-            thermal = image.select(thermal_bands).reduce(ee.Reducer.mean())
-        elif sensor == 'SENTINEL-2':
-            thermal = image.select('B11')
-        else:
+        thermal_bands = _THERMAL_BANDS.get(sensor)
+        if thermal_bands is None:
             logger.warning(f"⚠️ Unsupported sensor {sensor} for {image_id}, defaulting to Sentinel-2 B11")
-            thermal = image.select('B11')
-        hotspots = apply_threshold(thermal, 'B10' if sensor == 'LANDSAT_8' else 'B11', threshold, 'gt')
+            thermal_bands = _THERMAL_BANDS['SENTINEL-2']
+        thermal = image.select(thermal_bands)
+        if len(thermal_bands) > 1:
+            thermal = thermal.reduce(ee.Reducer.mean())
+        hotspots = apply_threshold(thermal.rename('thermal'), 'thermal', threshold, 'gt').rename(mask_band)
         final_image = image.addBands(hotspots)
     elif detection_type == 'water_bodies':
-        ndwi = compute_index(image, 'NDWI')
-        water_mask = apply_threshold(ndwi, 'NDWI', threshold, 'gt')
+        ndwi = compute_index(image, 'NDWI', sensor)
+        water_mask = apply_threshold(ndwi, 'NDWI', threshold, 'gt').rename(mask_band)
         final_image = image.addBands(water_mask)
     else:
         raise ValueError(f"Unsupported detection type: {detection_type}")
     
-    return await get_image_urls(final_image, aoi, [f"{detection_type}_mask"], scale, detection_type.capitalize(), place_name)
+    return await get_image_urls(final_image, aoi, [mask_band], scale, detection_type.capitalize(), place_name)
 
-async def time_series_analysis_util(collection_id: str, region: Optional[Union[str, Dict]], index: str, interval: str, place_name: Optional[str] = None) -> List[Dict]:
+async def time_series_analysis_util(collection_id: str, region: Optional[Union[str, Dict]], index: str, interval: str, place_name: Optional[str] = None, tile_scale: int = 4) -> List[Dict]:
     """
     Performs time series analysis on an ImageCollection for a given index.
+    `tile_scale` is passed to reduceRegion to avoid memory-limit errors on large regions.
+    Results are cached in Redis per collection, region, index and interval.
     """
+    region_key = region.serialize() if isinstance(region, ee.ComputedObject) else region
+    cache_key = "time_series:" + _generate_cache_key({
+        'collection_id': collection_id, 'region': region_key, 'index': index,
+        'interval': interval, 'tile_scale': tile_scale
+    })
+    cached = await asyncio.to_thread(get_cached_data_by_key, cache_key)
+    if cached:
+        logger.debug(f"Using cached {interval}ly {index} series for {collection_id}")
+        return cached['data']
+
     collection = ee.ImageCollection(collection_id)
     aoi = parse_region(region) if region else collection.first().geometry()
     collection = collection.filterBounds(aoi)
+    # Resolve the sensor once; the mapped function below runs server-side.
+    sensor = sensor_from_id(collection_id) or resolve_sensor(collection.first())
     
     def calculate_index(image):
-        indexed = compute_index(image, index)
+        indexed = compute_index(image, index, sensor)
         return indexed.set('system:time_start', image.get('system:time_start'))
     
     indexed_collection = collection.map(calculate_index)
     
     if interval == 'month':
         months = ee.List.sequence(1, 12)
+        # Months without images contribute a fully masked band, so they reduce to null
+        empty_month = ee.Image.constant(0).toFloat().updateMask(0).rename(index)
         def monthly_mean(m):
             monthly_col = indexed_collection.filter(ee.Filter.calendarRange(m, m, 'month'))
-            mean_image = monthly_col.mean()
-            stat = mean_image.reduceRegion(reducer=ee.Reducer.mean(), geometry=aoi, scale=30, maxPixels=1e10)
-            return ee.Feature(None, {'date': ee.Date.fromYMD(2020, m, 1).format('YYYY-MM-dd'), 'index_value': stat.get(index)})
-        features = months.map(monthly_mean).getInfo()
+            return ee.Image(ee.Algorithms.If(monthly_col.size(), monthly_col.mean().toFloat(), empty_month))
+        # Stack the 12 monthly means as bands ('0_<index>' .. '11_<index>') and reduce them in one pass
+        monthly_stack = ee.ImageCollection.fromImages(months.map(monthly_mean)).toBands()
+        stats = monthly_stack.reduceRegion(reducer=ee.Reducer.mean(), geometry=aoi, scale=30, maxPixels=1e10, tileScale=tile_scale).getInfo()
     else:
         raise NotImplementedError(f"Interval {interval} not yet implemented")
     
-    return [f['properties'] for f in features['features'] if f is not None]
+    series = [
+        {'date': f"2020-{month:02d}-01", 'index_value': stats.get(f"{month - 1}_{index}")}
+        for month in range(1, 13)
+    ]
+    await asyncio.to_thread(store_data_with_key, cache_key, series, TIME_SERIES_CACHE_TTL)
+    return series
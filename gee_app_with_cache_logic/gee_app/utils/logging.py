@@ -3,10 +3,11 @@ import os
 from flask import Flask
 from colorama import Fore, Style, init
 
-init(autoreset=True)
-
 logger = logging.getLogger('gee_app')
 
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+_colorama_initialized = False
+
 class ColoredFormatter(logging.Formatter):
     LOG_COLORS = {
         'INFO': Fore.GREEN,
@@ -23,17 +24,28 @@ class ColoredFormatter(logging.Formatter):
         'CRITICAL': '🔥',
     }
 
+    def __init__(self, fmt=None, datefmt=None):
+        super().__init__(fmt, datefmt)
+        # Per-level formatters with the emoji baked into the format string, built once so
+        # records are neither rewritten nor re-templated on every call. Keyed by the numeric
+        # level (logging.INFO, ...) so format() can look up record.levelno directly.
+        base_fmt = fmt or '%(message)s'
+        self._level_formatters = {
+            getattr(logging, level): (
+                logging.Formatter(base_fmt.replace('%(levelname)s', f"{emoji} %(levelname)s"), datefmt),
+                self.LOG_COLORS.get(level, ''),
+            )
+            for level, emoji in self.LOG_EMOJIS.items()
+        }
+
     def format(self, record):
-        log_level = record.levelname
-        color = self.LOG_COLORS.get(log_level, '')
-        emoji = self.LOG_EMOJIS.get(log_level, '  ')
-        record.levelname = f"{emoji} {log_level}"
-        if color:
-            return f"{color}{super().format(record)}{Style.RESET_ALL}"
-        else:
+        formatter, color = self._level_formatters.get(record.levelno, (None, ''))
+        if formatter is None:
             return super().format(record)
+        return f"{color}{formatter.format(record)}{Style.RESET_ALL}"
 
 def configure_logging(app: Flask) -> None:
+    global _colorama_initialized
     log_level = app.config.get('LOG_LEVEL', 'INFO')
     log_file = os.path.join(app.root_path, '..', 'app.log')
 
@@ -41,14 +53,23 @@ def configure_logging(app: Flask) -> None:
     logger.handlers.clear()
 
     file_handler = logging.FileHandler(log_file, encoding='utf-8')
-    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
 
+    # Colors only help on an interactive terminal; piped or collected output stays plain
     console_handler = logging.StreamHandler()
-    console_handler.setFormatter(ColoredFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    if console_handler.stream.isatty():
+        if not _colorama_initialized:
+            init(autoreset=True)
+            _colorama_initialized = True
+        console_handler.setFormatter(ColoredFormatter(LOG_FORMAT))
+    else:
+        console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
 
     logger.setLevel(getattr(logging, log_level.upper()))
     logger.addHandler(file_handler)
     logger.addHandler(console_handler)
+    # Records are fully handled here; don't hand them to root handlers as well
+    logger.propagate = False
 
     if os.environ.get('PYTHONIOENCODING') != 'utf-8':
         logger.warning("⚠️ PYTHONIOENCODING environment variable is not set to UTF-8. Emojis may not display correctly in the console.")
@@ -1,15 +1,62 @@
-from functools import lru_cache
 import logging
-import json
+import orjson
+from functools import lru_cache
+import threading
+import time
 from typing import Union, Dict, Optional, List
+from cachetools import TTLCache, cached
+from cachetools.keys import hashkey
 import ee
 
 logger = logging.getLogger(__name__)
 
-@lru_cache(maxsize=128)
+# Asset ID prefixes that identify the sensor without asking Earth Engine.
+SENSOR_ID_PREFIXES = (
+    (('LANDSAT/LC08', 'LANDSAT/LC09'), 'LANDSAT_8'),
+    (('LANDSAT/LE07', 'LANDSAT/LT05', 'LANDSAT/LT04'), 'LANDSAT_7_5'),
+    (('COPERNICUS/S2',), 'SENTINEL-2'),  # Also matches S2_SR and S2_HARMONIZED
+)
+
+# Band sets used to recognise a sensor when the image has no SATELLITE property
+_S2_BANDS = frozenset(('B8', 'B4', 'B3', 'B2'))
+_L8_BANDS = frozenset(('B5', 'B4', 'B3', 'B2'))
+_L75_BANDS = frozenset(('B4', 'B3', 'B2'))
+
+# Sensor lookups that needed Earth Engine are cached per process and shared across
+# workers through Redis under sensor:<image_id>.
+SENSOR_CACHE_TTL = 86400
+SENSOR_KEY_PREFIX = "sensor:"
+REDIS_RETRY_SECONDS = 60
+_sensor_cache = TTLCache(maxsize=4096, ttl=SENSOR_CACHE_TTL)
+_sensor_cache_lock = threading.Lock()
+_redis_retry_at = 0.0
+
+def _sensor_redis_client():
+    """Returns the Redis client, or None while Redis is considered unavailable."""
+    global _redis_retry_at
+    if time.time() < _redis_retry_at:
+        return None
+    try:
+        from gee_app.utils.cache_utils import get_redis_client  # Lazy: most lookups never reach Redis
+        return get_redis_client()
+    except Exception as e:
+        logger.warning("Redis unavailable for sensor types, using in-process cache only: %s", e)
+        _redis_retry_at = time.time() + REDIS_RETRY_SECONDS
+        return None
+
+def sensor_from_id(asset_id: str) -> Optional[str]:
+    """Return the sensor encoded in an image or collection ID, or None if the prefix is not known."""
+    if isinstance(asset_id, str):
+        for prefixes, sensor in SENSOR_ID_PREFIXES:
+            if asset_id.startswith(prefixes):
+                return sensor
+    return None
+
+@cached(_sensor_cache, lock=_sensor_cache_lock)
 def get_sensor_type(image_id: str) -> str:
     """
-    Determine sensor type using SATELLITE metadata or band fallback, with caching.
+    Determine sensor type from the asset ID prefix, falling back to the shared
+    Redis cache and then to SATELLITE metadata and band names, with caching.
 
     Args:
         image_id (str): Earth Engine image asset ID.
@@ -17,33 +64,135 @@ def get_sensor_type(image_id: str) -> str:
     Returns:
         str: Sensor type ('LANDSAT_8', 'LANDSAT_7_5', 'SENTINEL-2', 'UNKNOWN').
     """
+    sensor = sensor_from_id(image_id)
+    if sensor:
+        return sensor
+
+    client = _sensor_redis_client()
+    if client is not None:
+        try:
+            sensor = client.get(f"{SENSOR_KEY_PREFIX}{image_id}")
+            if sensor:
+                return sensor
+        except Exception as e:
+            logger.error("Error reading sensor type of %s from Redis: %s", image_id, e)
+
+    sensor = _query_sensor_type(image_id)
+    if client is not None and sensor != 'UNKNOWN':
+        try:
+            client.set(f"{SENSOR_KEY_PREFIX}{image_id}", sensor, ex=SENSOR_CACHE_TTL)
+        except Exception as e:
+            logger.error("Error writing sensor type of %s to Redis: %s", image_id, e)
+    return sensor
+
+def _sensor_from_satellite(satellite: Optional[str]) -> Optional[str]:
+    """Map a SATELLITE/SPACECRAFT_ID property value to a sensor type."""
+    if satellite:
+        if 'LANDSAT_8' in satellite or 'LANDSAT_9' in satellite:
+            return 'LANDSAT_8'
+        elif 'LANDSAT_7' in satellite or 'LANDSAT_5' in satellite:
+            return 'LANDSAT_7_5'
+        elif 'SENTINEL' in satellite:  # Fix: Detect Sentinel-2 correctly
+            return 'SENTINEL-2'
+    return None
+
+def _sensor_from_bands(band_names: List[str]) -> str:
+    """Recognise a sensor from its band names."""
+    bands = frozenset(band_names)
+    if _S2_BANDS <= bands:  # Fix: Sentinel-2 correct bands
+        return 'SENTINEL-2'
+    elif _L8_BANDS <= bands:  # Landsat-8 bands
+        return 'LANDSAT_8'
+    elif _L75_BANDS <= bands:  # Landsat-7/5 bands
+        return 'LANDSAT_7_5'
+    return 'UNKNOWN'
+
+def _query_sensor_type(image_id: str) -> str:
+    """Detect the sensor type through Earth Engine metadata or, failing that, band names."""
     try:
         image = ee.Image(image_id)
-        satellite = image.get('SATELLITE').getInfo()
-
         # Check metadata first
-        if satellite:
-            if 'LANDSAT_8' in satellite or 'LANDSAT_9' in satellite:
-                return 'LANDSAT_8'
-            elif 'LANDSAT_7' in satellite or 'LANDSAT_5' in satellite:
-                return 'LANDSAT_7_5'
-            elif 'SENTINEL' in satellite:  # Fix: Detect Sentinel-2 correctly
-                return 'SENTINEL-2'
+        sensor = _sensor_from_satellite(image.get('SATELLITE').getInfo())
+        if sensor:
+            return sensor
 
         # If SATELLITE property is missing, fall back to band detection
-        bands = image.bandNames().getInfo()
-        if set(['B8', 'B4', 'B3', 'B2']).issubset(bands):  # Fix: Sentinel-2 correct bands
-            return 'SENTINEL-2'
-        elif set(['B5', 'B4', 'B3', 'B2']).issubset(bands):  # Landsat-8 bands
-            return 'LANDSAT_8'
-        elif set(['B4', 'B3', 'B2']).issubset(bands):  # Landsat-7/5 bands
-            return 'LANDSAT_7_5'
-        
-        return 'UNKNOWN'
+        return _sensor_from_bands(image.bandNames().getInfo())
     
     except Exception as e:
-        logger.error(f"Error detecting sensor type for {image_id}: {str(e)}")
+        logger.error("Error detecting sensor type for %s: %s", image_id, e)
         return 'UNKNOWN'
+
+def get_sensor_types(image_ids: List[str]) -> Dict[str, str]:
+    """
+    Determine the sensor type of many images at once.
+
+    IDs are resolved by prefix and from the local and Redis caches first; the
+    metadata and band names of all remaining images are fetched from Earth
+    Engine in a single getInfo(). Results populate both caches.
+
+    Args:
+        image_ids (List[str]): Earth Engine image asset IDs.
+
+    Returns:
+        Dict[str, str]: Sensor type per image ID.
+    """
+    sensors = {}
+    residual = []
+    for image_id in dict.fromkeys(image_ids):
+        with _sensor_cache_lock:
+            sensor = _sensor_cache.get(hashkey(image_id))
+        sensor = sensor or sensor_from_id(image_id)
+        if sensor:
+            sensors[image_id] = sensor
+        else:
+            residual.append(image_id)
+    if not residual:
+        return sensors
+
+    client = _sensor_redis_client()
+    if client is not None:
+        try:
+            shared = client.mget([f"{SENSOR_KEY_PREFIX}{image_id}" for image_id in residual])
+            sensors.update((image_id, sensor) for image_id, sensor in zip(residual, shared) if sensor)
+            residual = [image_id for image_id in residual if image_id not in sensors]
+        except Exception as e:
+            logger.error("Error reading sensor types from Redis: %s", e)
+
+    fetched = {}
+    if residual:
+        try:
+            infos = ee.List([
+                ee.Dictionary({
+                    'properties': ee.Image(image_id).toDictionary(['SATELLITE', 'SPACECRAFT_ID']),
+                    'bands': ee.Image(image_id).bandNames(),
+                })
+                for image_id in residual
+            ]).getInfo()
+            for image_id, info in zip(residual, infos):
+                properties = info['properties']
+                satellite = properties.get('SATELLITE') or properties.get('SPACECRAFT_ID')
+                fetched[image_id] = _sensor_from_satellite(satellite) or _sensor_from_bands(info['bands'])
+        except Exception as e:
+            # One unreadable asset fails the whole batch; resolve the images individually instead
+            logger.warning("Batch sensor lookup failed, resolving %d images one by one: %s", len(residual), e)
+            fetched = {image_id: _query_sensor_type(image_id) for image_id in residual}
+    sensors.update(fetched)
+
+    with _sensor_cache_lock:
+        for image_id in sensors:
+            _sensor_cache[hashkey(image_id)] = sensors[image_id]
+    known = {image_id: sensor for image_id, sensor in fetched.items() if sensor != 'UNKNOWN'}
+    if client is not None and known:
+        try:
+            pipeline = client.pipeline()
+            for image_id, sensor in known.items():
+                pipeline.set(f"{SENSOR_KEY_PREFIX}{image_id}", sensor, ex=SENSOR_CACHE_TTL)
+            pipeline.execute()
+        except Exception as e:
+            logger.error("Error writing sensor types to Redis: %s", e)
+    return sensors
+
 def select_bands_for_satellite(image: ee.Image) -> List[str]:
     """
     Select suitable bands for the specific satellite.
@@ -68,6 +217,8 @@ def select_bands_for_satellite(image: ee.Image) -> List[str]:
 def parse_region(region: Union[str, Dict, ee.Geometry, None]) -> Optional[ee.Geometry]:
     """
     Parse and validate GeoJSON region, returning an ee.Geometry object.
+    Parsed regions are memoized, so repeated requests for the same area skip
+    JSON parsing, validation and geometry construction.
 
     Args:
         region (str | dict | ee.Geometry | None): GeoJSON as string, dict, or None.
@@ -87,29 +238,41 @@ def parse_region(region: Union[str, Dict, ee.Geometry, None]) -> Optional[ee.Geo
         logger.debug("parse_region received an ee.Geometry object, returning it as-is.")
         return region
     
-    logger.debug(f"parse_region received: {region}")
+    logger.debug("parse_region received: %s", region)
 
-    # If region is a string, attempt to parse it as JSON
     if isinstance(region, str):
-        try:
-            region_dict = json.loads(region)
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid GeoJSON string provided: {region} | Error: {str(e)}")
-            raise ValueError("Invalid GeoJSON string provided")
-    else:
-        region_dict = region
+        return _parse_region_json(region)
+
+    # Canonical JSON (sorted keys) so equal dicts share a cache entry
+    try:
+        canonical = orjson.dumps(region, option=orjson.OPT_SORT_KEYS).decode()
+    except TypeError:
+        return _geometry_from_geojson(region)
+    return _parse_region_json(canonical)
+
+@lru_cache(maxsize=256)
+def _parse_region_json(region: str) -> ee.Geometry:
+    """Parse a GeoJSON string into an ee.Geometry. Failures raise and are not cached."""
+    try:
+        region_dict = orjson.loads(region)
+    except orjson.JSONDecodeError as e:
+        logger.error("Invalid GeoJSON string provided: %s | Error: %s", region, e)
+        raise ValueError("Invalid GeoJSON string provided")
+    return _geometry_from_geojson(region_dict)
 
+def _geometry_from_geojson(region_dict) -> ee.Geometry:
+    """Validate a GeoJSON dictionary and convert it to an ee.Geometry."""
     # Validate GeoJSON format
     if not isinstance(region_dict, dict):
-        logger.error(f"Region is not a valid dictionary: {region_dict}")
+        logger.error("Region is not a valid dictionary: %s", region_dict)
         raise ValueError("GeoJSON must be a dictionary")
 
     if 'type' not in region_dict or 'coordinates' not in region_dict:
-        logger.error(f"GeoJSON missing 'type' or 'coordinates': {region_dict}")
+        logger.error("GeoJSON missing 'type' or 'coordinates': %s", region_dict)
         raise ValueError("GeoJSON must include 'type' and 'coordinates'")
 
     if region_dict['type'] not in ['Polygon', 'MultiPolygon']:
-        logger.error(f"Unsupported GeoJSON type: {region_dict['type']}")
+        logger.error("Unsupported GeoJSON type: %s", region_dict['type'])
         raise ValueError("GeoJSON type must be 'Polygon' or 'MultiPolygon'")
 
     # Convert to ee.Geometry
@@ -119,5 +282,5 @@ def parse_region(region: Union[str, Dict, ee.Geometry, None]) -> Optional[ee.Geo
         else:  # MultiPolygon
             return ee.Geometry.MultiPolygon(region_dict['coordinates'])
     except Exception as e:
-        logger.error(f"Failed to create ee.Geometry: {str(e)}")
-        raise ValueError("Failed to convert GeoJSON to Earth Engine Geometry")
\ No newline at end of file
+        logger.error("Failed to create ee.Geometry: %s", e)
+        raise ValueError("Failed to convert GeoJSON to Earth Engine Geometry")
@@ -1,10 +1,20 @@
-import requests
-import json
+import asyncio
+import httpx
+import orjson
 
 url = "http://localhost:5000/gee/extract"
 headers = {"Content-Type": "application/json"}
-with open("request.json", "r") as f:
-    data = json.load(f)
 
-response = requests.post(url, headers=headers, json=data)
-print(response.text)
+async def main():
+    # request.json holds one payload or a list of payloads; a list is sent concurrently
+    with open("request.json", "rb") as f:
+        data = orjson.loads(f.read())
+    payloads = data if isinstance(data, list) else [data]
+
+    limits = httpx.Limits(max_keepalive_connections=32)
+    async with httpx.AsyncClient(headers=headers, limits=limits, timeout=None) as client:
+        responses = await asyncio.gather(*(client.post(url, content=orjson.dumps(p)) for p in payloads))
+    for response in responses:
+        print(response.text)
+
+asyncio.run(main())
@@ -1,14 +1,26 @@
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import rasterio
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
-from fastapi.responses import FileResponse
+from rasterio.io import MemoryFile
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, BackgroundTasks
+from fastapi.responses import FileResponse, ORJSONResponse, Response
 from typing import Optional
 import tempfile
 from pathlib import Path
 from matplotlib.colors import LinearSegmentedColormap
+from image_utils import ndvi_tile_kernel, evi_tile_kernel
 
-app = FastAPI(title="Vegetation Indices Calculator API")
+# CuPy is optional; without it (or without a GPU) device="cuda" requests are rejected
+try:
+    import cupy as cp
+    GPU_AVAILABLE = cp.cuda.runtime.getDeviceCount() > 0
+except Exception:
+    cp = None
+    GPU_AVAILABLE = False
+
+app = FastAPI(title="Vegetation Indices Calculator API", default_response_class=ORJSONResponse)
 
 # Define a custom NDVI colormap (low NDVI = red/brown, high NDVI = green)
 def get_vegetation_colormap():
@@ -24,85 +36,136 @@ def get_vegetation_colormap():
     ]
     return LinearSegmentedColormap.from_list('vegetation', colors, N=256)
 
+# RGB lookup table for the colormap, built once (256 entries, alpha dropped, 0-255 range)
+_VEG_LUT = (get_vegetation_colormap()(np.arange(256))[:, :3] * 255).astype(np.uint8)
+
 # Helper function to apply colormap to NDVI/EVI values
 def apply_colormap_to_image(index_image: np.ndarray, min_val: float = -1.0, max_val: float = 1.0):
-    # Normalize the index values to 0-1 range
-    norm_image = np.clip((index_image - min_val) / (max_val - min_val), 0, 1)
-    
-    # Get the colormap
-    cmap = get_vegetation_colormap()
+    # Scale the index values onto the 256 LUT entries, binning them as the colormap itself does
+    lut_index = (index_image - min_val) * (256 / (max_val - min_val))
+    np.clip(lut_index, 0, 255, out=lut_index)
     
-    # Convert normalized values to RGB (0-255 range)
-    rgb = (cmap(norm_image)[:, :, :3] * 255).astype(np.uint8)  # Drop alpha channel, scale to 0-255
-    
-    return rgb  # Shape: (height, width, 3)
+    return _VEG_LUT[lut_index.astype(np.uint8)]  # Shape: (height, width, 3)
+
+# GPU versions of the NDVI/EVI kernels in image_utils. Tiles below GPU_MIN_TILE_PIXELS stay
+# on the CPU, where the host/device copies would cost more than the kernel saves.
+GPU_MIN_TILE_PIXELS = 1 << 20
+if GPU_AVAILABLE:
+    ndvi_gpu_kernel = cp.ElementwiseKernel(
+        'float32 r, float32 n', 'float32 o',
+        'float d = n + r; o = d > 0 ? (n - r) / d : 0.0f;',
+        'ndvi_kernel'
+    )
+    evi_gpu_kernel = cp.ElementwiseKernel(
+        'float32 r, float32 n, float32 b, float32 G, float32 C1, float32 C2, float32 L', 'float32 o',
+        'float d = n + C1 * r - C2 * b + L; o = d > 0 ? G * (n - r) / d : 0.0f;',
+        'evi_kernel'
+    )
+
+def use_gpu(device: str, tile: np.ndarray) -> bool:
+    return device == "cuda" and GPU_AVAILABLE and tile.size >= GPU_MIN_TILE_PIXELS
 
 # Helper function to calculate NDVI
-def calculate_ndvi(dataset, red_band: int, nir_band: int):
+def calculate_ndvi(dataset, red_band: int, nir_band: int, window=None, device: str = "cpu"):
     try:
         if max(red_band, nir_band) > dataset.count:
             raise ValueError(f"File has {dataset.count} bands, but band {max(red_band, nir_band)} was requested.")
         
-        red = dataset.read(red_band).astype(np.float32)
-        nir = dataset.read(nir_band).astype(np.float32)
+        red = dataset.read(red_band, window=window, out_dtype=np.float32)
+        nir = dataset.read(nir_band, window=window, out_dtype=np.float32)
         
-        denominator = nir + red
-        ndvi = np.where(denominator > 0, (nir - red) / denominator, 0)
+        if use_gpu(device, red):
+            return cp.asnumpy(ndvi_gpu_kernel(cp.asarray(red), cp.asarray(nir)))
+        ndvi = np.empty_like(red)
+        ndvi_tile_kernel(red, nir, ndvi)
         return ndvi
     except Exception as e:
         raise ValueError(f"Failed to calculate NDVI: {str(e)}")
 
 # Helper function to calculate EVI
-def calculate_evi(dataset, red_band: int, nir_band: int, blue_band: int, G: float = 2.5, C1: float = 6.0, C2: float = 7.5, L: float = 1.0):
+def calculate_evi(dataset, red_band: int, nir_band: int, blue_band: int, G: float = 2.5, C1: float = 6.0, C2: float = 7.5, L: float = 1.0, window=None, device: str = "cpu"):
     try:
         if max(red_band, nir_band, blue_band) > dataset.count:
             raise ValueError(f"File has {dataset.count} bands, but band {max(red_band, nir_band, blue_band)} was requested.")
         
-        red = dataset.read(red_band).astype(np.float32)
-        nir = dataset.read(nir_band).astype(np.float32)
-        blue = dataset.read(blue_band).astype(np.float32)
+        red = dataset.read(red_band, window=window, out_dtype=np.float32)
+        nir = dataset.read(nir_band, window=window, out_dtype=np.float32)
+        blue = dataset.read(blue_band, window=window, out_dtype=np.float32)
         
-        denominator = nir + C1 * red - C2 * blue + L
-        evi = np.where(denominator > 0, G * (nir - red) / denominator, 0)
+        if use_gpu(device, red):
+            coefficients = (np.float32(G), np.float32(C1), np.float32(C2), np.float32(L))
+            return cp.asnumpy(evi_gpu_kernel(cp.asarray(red), cp.asarray(nir), cp.asarray(blue), *coefficients))
+        evi = np.empty_like(red)
+        evi_tile_kernel(red, nir, blue, G, C1, C2, L, evi)
         return evi
     except Exception as e:
         raise ValueError(f"Failed to calculate EVI: {str(e)}")
 
-# Save processed image as GeoTIFF (single-band or RGB)
-def save_tif(image_data: np.ndarray, input_dataset, output_path: str, is_rgb: bool = False):
-    if is_rgb:
-        # RGB image (3 bands)
-        with rasterio.open(
-            output_path,
-            'w',
-            driver='GTiff',
-            height=image_data.shape[0],
-            width=image_data.shape[1],
-            count=3,  # 3 bands for RGB
-            dtype=image_data.dtype,
-            crs=input_dataset.crs,
-            transform=input_dataset.transform,
-        ) as dst:
-            for i in range(3):
-                dst.write(image_data[:, :, i], i + 1)
-    else:
-        # Single-band image
-        with rasterio.open(
-            output_path,
-            'w',
-            driver='GTiff',
-            height=image_data.shape[0],
-            width=image_data.shape[1],
-            count=1,
-            dtype=image_data.dtype,
-            crs=input_dataset.crs,
-            transform=input_dataset.transform,
-        ) as dst:
-            dst.write(image_data, 1)
+# Scaled-integer encoding for index outputs (MODIS / Sentinel-2 L2A convention): value * 10000 as int16
+INT16_SCALE_FACTOR = 10000
+INT16_NODATA = -32768
+
+def quantize_index(index_tile: np.ndarray) -> np.ndarray:
+    scaled = index_tile * INT16_SCALE_FACTOR
+    np.clip(scaled, -INT16_SCALE_FACTOR, INT16_SCALE_FACTOR, out=scaled)
+    return np.rint(scaled, out=scaled).astype(np.int16)
+
+# Open the output GeoTIFF (single-band index or colorized RGB) for tile-by-tile writes
+def open_output_tif(input_dataset, output_path: str, is_rgb: bool = False, output_dtype: str = "float32"):
+    profile = dict(
+        driver='GTiff',
+        height=input_dataset.height,
+        width=input_dataset.width,
+        count=3 if is_rgb else 1,
+        dtype=np.uint8 if is_rgb else output_dtype,
+        crs=input_dataset.crs,
+        transform=input_dataset.transform,
+    )
+    if not is_rgb and output_dtype == "int16":
+        # Compressed, tiled output; readers recover the index through the band scale
+        profile.update(nodata=INT16_NODATA, compress='deflate', predictor=2, tiled=True, blockxsize=512, blockysize=512)
+    dst = rasterio.open(output_path, 'w', **profile)
+    if not is_rgb and output_dtype == "int16":
+        dst.scales = (1 / INT16_SCALE_FACTOR,)
+    return dst
+
+# Process every block of the input concurrently and write it to the output.
+# GDAL releases the GIL while reading and writing, so tiles overlap. Dataset handles are not
+# thread-safe: each worker opens its own reader and writes to the shared output are serialized.
+def process_blocks(input_path: str, dataset, dst, process_tile, max_workers: Optional[int] = None):
+    local = threading.local()
+    readers = []
+    readers_lock = threading.Lock()
+    write_lock = threading.Lock()
+
+    def get_reader():
+        if not hasattr(local, 'dataset'):
+            local.dataset = rasterio.open(input_path)
+            with readers_lock:
+                readers.append(local.dataset)
+        return local.dataset
+
+    def run(window):
+        tile = process_tile(get_reader(), window)  # Shape: (bands, height, width)
+        with write_lock:
+            dst.write(tile, window=window)
+
+    windows = [window for _, window in dataset.block_windows(1)]
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            # Consuming the results re-raises the first error from a worker
+            list(executor.map(run, windows))
+    finally:
+        for reader in readers:
+            reader.close()
+
+# Uploads up to this size are processed entirely in memory; larger ones are staged on disk
+IN_MEMORY_MAX_BYTES = 512 * 1024 * 1024
 
 # API Endpoint to process the image
 @app.post("/calculate-index/")
 async def calculate_index(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     index_type: str = Form(default="NDVI", regex="^(NDVI|EVI)$"),
     red_band: int = Form(default=4),
@@ -114,7 +177,9 @@ async def calculate_index(
     evi_l: Optional[float] = Form(default=1.0),
     apply_colormap: Optional[bool] = Form(default=False),
     min_display: Optional[float] = Form(default=-1.0),
-    max_display: Optional[float] = Form(default=1.0)
+    max_display: Optional[float] = Form(default=1.0),
+    device: str = Form(default="cpu", regex="^(cpu|cuda)$"),
+    output_dtype: str = Form(default="float32", regex="^(float32|int16)$")
 ):
     """
     Calculate vegetation index (NDVI or EVI) from a .tif image and optionally apply a colormap.
@@ -128,57 +193,82 @@ async def calculate_index(
     - apply_colormap: If true, return a colorized RGB .tif (default: False)
     - min_display: Min value for colormap scaling (default: -1.0)
     - max_display: Max value for colormap scaling (default: 1.0)
+    - device: "cpu" or "cuda"; cuda runs large tiles on the GPU and needs CuPy (default: "cpu")
+    - output_dtype: "float32" or "int16" (index * 10000, deflate-compressed) for the single-band output (default: "float32")
     Returns:
     - Processed .tif file (single-band index or colorized RGB)
     """
     # Check file extension
     if not file.filename.lower().endswith(('.tif', '.tiff')):
         raise HTTPException(status_code=400, detail="Only .tif or .tiff files are supported.")
+    if device == "cuda" and not GPU_AVAILABLE:
+        raise HTTPException(status_code=400, detail="CUDA was requested but no GPU (or CuPy) is available.")
 
-    # Use a temporary file to store the uploaded image
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".tif") as temp_input:
-        temp_input.write(await file.read())
-        temp_input_path = temp_input.name
+    data = await file.read()
+    output_filename = f"{index_type}_colorized.tif" if apply_colormap else f"{index_type}_result.tif"
+    headers = {"Content-Disposition": f"attachment; filename={output_filename}"}
 
+    def process_tile(dataset, window):
+        # Calculate the requested index
+        if index_type == "NDVI":
+            index_tile = calculate_ndvi(dataset, red_band, nir_band, window=window, device=device)
+        else:  # EVI
+            index_tile = calculate_evi(dataset, red_band, nir_band, blue_band, evi_g, evi_c1, evi_c2, evi_l, window=window, device=device)
+
+        if apply_colormap:
+            # Apply colormap and return as RGB
+            return np.moveaxis(apply_colormap_to_image(index_tile, min_display, max_display), -1, 0)
+        # Single-band index
+        if output_dtype == "int16":
+            index_tile = quantize_index(index_tile)
+        return index_tile[np.newaxis]
+
+    def write_index(input_path: str, output_path: str):
+        # Process the image block by block so only the tiles in flight are held in memory.
+        # The GDAL block cache is capped at 512 MB (rasterio takes GDAL_CACHEMAX in bytes).
+        with rasterio.Env(GDAL_CACHEMAX=512 * 1024 * 1024), rasterio.open(input_path) as dataset:
+            with open_output_tif(dataset, output_path, is_rgb=apply_colormap, output_dtype=output_dtype) as dst:
+                process_blocks(input_path, dataset, dst, process_tile)
+
+    temp_input_path = output_path = None
     try:
-        # Open the uploaded image
-        with rasterio.open(temp_input_path) as dataset:
-            # Calculate the requested index
-            if index_type == "NDVI":
-                index_image = calculate_ndvi(dataset, red_band, nir_band)
-            else:  # EVI
-                index_image = calculate_evi(dataset, red_band, nir_band, blue_band, evi_g, evi_c1, evi_c2, evi_l)
-
-            # Save the result to a temporary output file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".tif") as temp_output:
-                output_path = temp_output.name
-                
-                if apply_colormap:
-                    # Apply colormap and save as RGB
-                    rgb_image = apply_colormap_to_image(index_image, min_display, max_display)
-                    save_tif(rgb_image, dataset, output_path, is_rgb=True)
-                    output_filename = f"{index_type}_colorized.tif"
-                else:
-                    # Save as single-band index
-                    save_tif(index_image, dataset, output_path, is_rgb=False)
-                    output_filename = f"{index_type}_result.tif"
+        if len(data) <= IN_MEMORY_MAX_BYTES:
+            # Small rasters never touch the disk: input and output live in GDAL's /vsimem/
+            with MemoryFile(data) as memory_input, MemoryFile() as memory_output:
+                write_index(memory_input.name, memory_output.name)
+                return Response(memory_output.read(), media_type="image/tiff", headers=headers)
+
+        # Use temporary files for large images
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".tif") as temp_input:
+            temp_input.write(data)
+            temp_input_path = temp_input.name
+        del data
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".tif") as temp_output:
+            output_path = temp_output.name
+
+        write_index(temp_input_path, output_path)
+        # Delete the output once the response has been sent
+        background_tasks.add_task(os.remove, output_path)
 
         # Return the processed file
         return FileResponse(
             output_path,
             media_type="image/tiff",
             filename=output_filename,
-            headers={"Content-Disposition": f"attachment; filename={output_filename}"}
+            headers=headers
         )
     except ValueError as ve:
+        if output_path:
+            os.remove(output_path)
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
+        if output_path:
+            os.remove(output_path)
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
     finally:
         # Clean up temporary input file
-        if os.path.exists(temp_input_path):
+        if temp_input_path and os.path.exists(temp_input_path):
             os.remove(temp_input_path)
-        # Output file will be cleaned up by the OS after response
 
 # Run the app (for local testing)
 if __name__ == "__main__":
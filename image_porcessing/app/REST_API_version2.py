@@ -1,24 +1,239 @@
 import os
 import time
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
 from datetime import datetime
 from typing import Optional, List
 import numpy as np
 import rasterio
+from rasterio.io import MemoryFile
+from rasterio.enums import Resampling
+from rasterio.windows import Window
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException
-from starlette.responses import Response, FileResponse
+from fastapi.responses import ORJSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response, FileResponse, StreamingResponse
 import json
-import matplotlib.pyplot as plt
+from functools import lru_cache
+from PIL import Image, ImageDraw
 from matplotlib.colors import LinearSegmentedColormap
+from png_encoding import encode_png
+from image_utils import aligned_empty, ndvi_kernel, evi_kernel, savi_kernel, ndwi_kernel, stats_kernel, histogram_kernel, kernel_dtype
 
 
-app = FastAPI(title="Satellite Vegetation Indices Calculator API")
+# Uploads are copied to disk in chunks of this many bytes
+UPLOAD_CHUNK_SIZE = 1 << 20
+# The PNG part of the multipart response is sent in chunks of this many bytes
+RESPONSE_CHUNK_SIZE = 1 << 20
+# Uploads up to this size are opened in memory; larger ones are staged on disk
+IN_MEMORY_MAX_BYTES = 512 * 1024 * 1024
+# Rows per window when the input is striped rather than tiled
+STRIP_ROWS = 256
+# Longest side, in pixels, of the index raster rendered to PNG
+PREVIEW_MAX_SIZE = 2048
+# The median comes from a histogram built while the index is written: MEDIAN_BINS bins over
+# MEDIAN_RANGE, where normalized-difference indices fall. If the median lands among the values
+# outside it (EVI, SAVI), that span is re-binned from the written GeoTIFF.
+MEDIAN_BINS = 65536
+MEDIAN_RANGE = (-1.0, 1.0)
+
+RESULT_OUTPUT_DIR = "output"
+# Files in RESULT_OUTPUT_DIR not modified for this long are deleted; the sweep runs at most
+# once per RESULT_SWEEP_INTERVAL seconds
+RESULT_RETENTION_SECONDS = int(os.environ.get("RESULT_RETENTION_SECONDS", str(24 * 3600)))
+RESULT_SWEEP_INTERVAL = 600
+_last_sweep = 0.0
+_sweep_lock = threading.Lock()
+
+
+def prune_outputs():
+    # Retention for the per-request PNG/GeoTIFF outputs (and any stale input copies)
+    global _last_sweep
+    now = time.time()
+    with _sweep_lock:
+        if now - _last_sweep < RESULT_SWEEP_INTERVAL:
+            return
+        _last_sweep = now
+    try:
+        entries = list(os.scandir(RESULT_OUTPUT_DIR))
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            if entry.is_file() and now - entry.stat().st_mtime > RESULT_RETENTION_SECONDS:
+                os.remove(entry.path)
+        except OSError:
+            pass  # Already removed, or still in use
+
+
+# Custom colormap for vegetation indices
+VEGETATION_COLORS = ['#d73027', '#f46d43', '#fdae61', '#fee08b', '#d9ef8b', '#a6d96a', '#66bd63', '#1a9850']
+VEGETATION_CMAP = LinearSegmentedColormap.from_list('vegetation', VEGETATION_COLORS, N=256)
+
+# RGBA lookup table for the colormap, built once (256 entries, 0-255 range)
+_VEG_LUT = VEGETATION_CMAP(np.arange(256), bytes=True)
+
+# Results are also kept on disk, keyed by upload content + index + parameters: an entry
+# RESULT_CACHE_DIR/<key>.json references the PNG/GeoTIFF files in RESULT_OUTPUT_DIR
+RESULT_CACHE_DIR = os.path.join(RESULT_OUTPUT_DIR, "cache")
+# Number of entries kept on disk; the least recently used (by mtime) are evicted with their files
+RESULT_DISK_CACHE_SIZE = int(os.environ.get("RESULT_DISK_CACHE_SIZE", "256"))
+_disk_cache_lock = threading.Lock()
+# Number of results held in memory for hot repeat requests
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", "32"))
+_result_cache = OrderedDict()
+_result_cache_lock = threading.Lock()
+
+# Worker processes for PNG encoding. The images are at most PREVIEW_MAX_SIZE wide, so a
+# few workers keep up; they only import png_encoding (numpy + PIL), not this app.
+PNG_WORKERS = min(4, os.cpu_count() or 1)
+_png_executor = None
+_png_executor_lock = threading.Lock()
+
+# Layout of the rendered PNG, in pixels
+TITLE_HEIGHT = 20
+COLORBAR_PADDING = 10
+COLORBAR_WIDTH = 20
+COLORBAR_LABEL_WIDTH = 60
+
+
+@lru_cache(maxsize=16)
+def colorbar_strip(height: int) -> Image.Image:
+    # Vertical colorbar, highest value at the top
+    gradient = np.repeat(np.linspace(255, 0, height).astype(np.uint8)[:, np.newaxis], COLORBAR_WIDTH, axis=1)
+    return Image.fromarray(_VEG_LUT[gradient], "RGBA")
+
+
+def empty_histogram(bins: int = MEDIAN_BINS) -> tuple:
+    # (counts, mins, maxs) for histogram_kernel, with the two outer bins
+    return np.zeros(bins + 2, dtype=np.int64), np.full(bins + 2, np.inf), np.full(bins + 2, -np.inf)
+
+
+def histogram_bin(histogram: tuple, rank: int) -> int:
+    # Bin holding the value of 0-based `rank` among the counted values
+    return int(np.searchsorted(np.cumsum(histogram[0]), rank, side="right"))
+
+
+def histogram_value(histogram: tuple, rank: int) -> float:
+    # Value of 0-based `rank`: exact when its bin holds a single distinct value, otherwise
+    # interpolated between the bin's smallest and largest value
+    counts, mins, maxs = histogram
+    b = histogram_bin(histogram, rank)
+    within = rank - int(counts[:b].sum())
+    if mins[b] == maxs[b]:
+        return float(mins[b])
+    return float(mins[b] + (maxs[b] - mins[b]) * within / (counts[b] - 1))
+
+
+def png_executor() -> ProcessPoolExecutor:
+    # Created on first use; "spawn" because the server process is multi-threaded by then
+    global _png_executor
+    with _png_executor_lock:
+        if _png_executor is None:
+            _png_executor = ProcessPoolExecutor(max_workers=PNG_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _png_executor
+
+
+def result_cache_key(content_digest: bytes, index_type: str, params: dict) -> str:
+    # Same upload + same index + same parameters -> same result
+    key = hashlib.blake2b(content_digest, digest_size=20)
+    key.update(json.dumps([index_type.upper(), params], sort_keys=True).encode())
+    return key.hexdigest()
+
+
+def get_cached_result(key: str):
+    """Return (png_bytes, png_filename, geotiff_filename, statistics) for `key`, or None."""
+    entry_path = os.path.join(RESULT_CACHE_DIR, f"{key}.json")
+    with _result_cache_lock:
+        result = _result_cache.get(key)
+        if result is not None:
+            _result_cache.move_to_end(key)
+    if result is None:
+        try:
+            with open(entry_path, "rb") as f:
+                entry = json.load(f)
+            with open(os.path.join(RESULT_OUTPUT_DIR, entry["png_filename"]), "rb") as f:
+                png = f.read()
+            result = (png, entry["png_filename"], entry["geotiff_filename"], entry["statistics"])
+        except (OSError, ValueError, KeyError):
+            return None
+        _remember_result(key, result)
+    try:
+        # Touch the entry and its files: mtime is the last use, for eviction and prune_outputs.
+        # The GeoTIFF named in the response may have been evicted or pruned.
+        for path in (entry_path, os.path.join(RESULT_OUTPUT_DIR, result[1]), os.path.join(RESULT_OUTPUT_DIR, result[2])):
+            os.utime(path)
+    except OSError:
+        with _result_cache_lock:
+            _result_cache.pop(key, None)
+        _remove_files([entry_path])
+        return None
+    return result
+
+
+def store_cached_result(key: str, png: bytes, png_filename: str, geotiff_filename: str, stats: dict):
+    # The entry points at the PNG and GeoTIFF already saved in the output directory
+    os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+    with open(os.path.join(RESULT_CACHE_DIR, f"{key}.json"), "w") as f:
+        json.dump({"png_filename": png_filename, "geotiff_filename": geotiff_filename, "statistics": stats}, f)
+    _remember_result(key, (png, png_filename, geotiff_filename, stats))
+    evict_disk_cache()
+
+
+def evict_disk_cache():
+    # Keep at most RESULT_DISK_CACHE_SIZE entries, dropping the least recently used with their outputs
+    with _disk_cache_lock:
+        try:
+            entries = [(entry.stat().st_mtime, entry.path) for entry in os.scandir(RESULT_CACHE_DIR) if entry.name.endswith(".json")]
+        except OSError:
+            return
+        if len(entries) <= RESULT_DISK_CACHE_SIZE:
+            return
+        entries.sort()
+        for _, entry_path in entries[:len(entries) - RESULT_DISK_CACHE_SIZE]:
+            key = os.path.basename(entry_path)[:-len(".json")]
+            with _result_cache_lock:
+                _result_cache.pop(key, None)
+            paths = [entry_path]
+            try:
+                with open(entry_path, "rb") as f:
+                    entry = json.load(f)
+                paths += [os.path.join(RESULT_OUTPUT_DIR, entry["png_filename"]), os.path.join(RESULT_OUTPUT_DIR, entry["geotiff_filename"])]
+            except (OSError, ValueError, KeyError):
+                pass
+            _remove_files(paths)
+
+
+def _remove_files(paths: List[str]):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # Already removed
+
+
+def _remember_result(key: str, result: tuple):
+    with _result_cache_lock:
+        _result_cache[key] = result
+        _result_cache.move_to_end(key)
+        while len(_result_cache) > RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+
+
+app = FastAPI(title="Satellite Vegetation Indices Calculator API", default_response_class=ORJSONResponse)
 
 class VegetationIndicesCalculator:
-    def __init__(self, filepath: str):
+    def __init__(self, filepath: str, dataset=None):
+        # `dataset` may be an already-open rasterio dataset (e.g. from a MemoryFile);
+        # `filepath` is then only used to label the output
         self.filepath = filepath
-        self.dataset = None
+        self.dataset = dataset
         self.index_image = None
-        self.load_image()
+        if self.dataset is None:
+            self.load_image()
     
     def load_image(self):
         try:
@@ -26,7 +241,13 @@ class VegetationIndicesCalculator:
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Failed to load image: {str(e)}")
 
-    def calculate_ndvi(self, red_band: int = 1, nir_band: int = 2) -> np.ndarray:
+    def read_bands(self, bands: list, window=None, out_shape=None) -> np.ndarray:
+        # Bands for the kernels, in the file's dtype when they have a variant for it. A reduced
+        # out_shape averages the source pixels (or reads a matching overview).
+        return self.dataset.read(bands, window=window, out_shape=out_shape, resampling=Resampling.average,
+                                 out_dtype=kernel_dtype(self.dataset.dtypes[0]))
+
+    def calculate_ndvi(self, red_band: int = 1, nir_band: int = 2, window=None, out_shape=None) -> np.ndarray:
         try:
             # Check if bands exist
             max_band = max(red_band, nir_band)
@@ -36,11 +257,10 @@ class VegetationIndicesCalculator:
                     detail=f"The selected file only has {self.dataset.count} bands, but band {max_band} was requested."
                 )
             
-            red = self.dataset.read(red_band).astype(np.float32)
-            nir = self.dataset.read(nir_band).astype(np.float32)
+            red, nir = self.read_bands([red_band, nir_band], window, out_shape)
             
-            denominator = nir + red
-            ndvi = np.where(denominator > 0, (nir - red) / denominator, 0)
+            ndvi = aligned_empty(red.shape)
+            ndvi_kernel(red, nir, ndvi)
             
             return ndvi
         except Exception as e:
@@ -54,7 +274,9 @@ class VegetationIndicesCalculator:
         G: float = 2.5,
         C1: float = 6.0,
         C2: float = 7.5,
-        L: float = 1.0
+        L: float = 1.0,
+        window=None,
+        out_shape=None
     ) -> np.ndarray:
         try:
             # Check if bands exist
@@ -65,67 +287,182 @@ class VegetationIndicesCalculator:
                     detail=f"The selected file only has {self.dataset.count} bands, but band {max_band} was requested."
                 )
             
-            red = self.dataset.read(red_band).astype(np.float32)
-            nir = self.dataset.read(nir_band).astype(np.float32)
-            blue = self.dataset.read(blue_band).astype(np.float32)
+            red, nir, blue = self.read_bands([red_band, nir_band, blue_band], window, out_shape)
             
-            denominator = nir + C1 * red - C2 * blue + L
-            evi = np.where(denominator > 0, G * (nir - red) / denominator, 0)
+            evi = aligned_empty(red.shape)
+            # Coefficients as floats so integer JSON values reuse the warmed-up specialization
+            evi_kernel(red, nir, blue, float(G), float(C1), float(C2), float(L), evi)
             
             return evi
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to calculate EVI: {str(e)}")
 
-    def calculate_savi(self, red_band: int = 1, nir_band: int = 2, L: float = 0.5) -> np.ndarray:
+    def calculate_savi(self, red_band: int = 1, nir_band: int = 2, L: float = 0.5, window=None, out_shape=None) -> np.ndarray:
         try:
-            red = self.dataset.read(red_band).astype(np.float32)
-            nir = self.dataset.read(nir_band).astype(np.float32)
+            red, nir = self.read_bands([red_band, nir_band], window, out_shape)
             
-            return ((nir - red) / (nir + red + L)) * (1 + L)
+            savi = aligned_empty(red.shape)
+            savi_kernel(red, nir, float(L), savi)
+            
+            return savi
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to calculate SAVI: {str(e)}")
 
-    def calculate_ndwi(self, green_band: int = 2, nir_band: int = 3) -> np.ndarray:
+    def calculate_ndwi(self, green_band: int = 2, nir_band: int = 3, window=None, out_shape=None) -> np.ndarray:
         try:
-            green = self.dataset.read(green_band).astype(np.float32)
-            nir = self.dataset.read(nir_band).astype(np.float32)
+            green, nir = self.read_bands([green_band, nir_band], window, out_shape)
+            
+            ndwi = aligned_empty(green.shape)
+            ndwi_kernel(green, nir, ndwi)
             
-            return (green - nir) / (green + nir)
+            return ndwi
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to calculate NDWI: {str(e)}")
 
-    def save_result(self, index_image: np.ndarray, output_path: str, index_type: str):
+    def iter_windows(self):
+        # Follow the file's internal tiling; striped files are grouped into bands of rows
+        block_height, block_width = self.dataset.block_shapes[0]
+        if block_width < self.dataset.width:
+            for _, window in self.dataset.block_windows(1):
+                yield window
+            return
+        rows = max(block_height, STRIP_ROWS)
+        for row in range(0, self.dataset.height, rows):
+            yield Window(0, row, self.dataset.width, min(rows, self.dataset.height - row))
+
+    def write_index(self, index_fn, output_path: str) -> tuple:
+        """Compute the index window by window into a float32 GeoTIFF.
+
+        Memory use is bounded by the window size. Returns the (count, min, max, sum, sum of
+        squares, median) of the finite values: the moments are merged from stats_kernel over
+        every window and the median is read off a fixed-bin histogram of all of them.
+        """
+        block_height, block_width = self.dataset.block_shapes[0]
+        tiled = block_width < self.dataset.width and block_width % 16 == 0 and block_height % 16 == 0
+        profile = {
+            "driver": "GTiff",
+            "height": self.dataset.height,
+            "width": self.dataset.width,
+            "count": 1,
+            "dtype": "float32",
+            "crs": self.dataset.crs,
+            "transform": self.dataset.transform,
+            "tiled": True,
+            "blockxsize": block_width if tiled else 256,
+            "blockysize": block_height if tiled else 256,
+        }
+        count, lo, hi, total, total_sq = 0, np.inf, -np.inf, 0.0, 0.0
+        histogram = empty_histogram()
+        with rasterio.open(output_path, "w", **profile) as dst:
+            for window in self.iter_windows():
+                tile = index_fn(window=window)
+                dst.write(tile, 1, window=window)
+                values = tile.ravel()
+                tile_count, tile_lo, tile_hi, tile_total, tile_total_sq = stats_kernel(values)
+                count += tile_count
+                lo = min(lo, tile_lo)
+                hi = max(hi, tile_hi)
+                total += tile_total
+                total_sq += tile_total_sq
+                histogram_kernel(values, *MEDIAN_RANGE, *histogram)
+        
+        median = float("nan")
+        if count:
+            # Average of the two middle values for even counts, as np.median does
+            ranks = sorted({(count - 1) // 2, count // 2})
+            median = sum(self.rank_value(histogram, rank, output_path, lo, hi) for rank in ranks) / len(ranks)
+        return count, lo, hi, total, total_sq, median
+
+    def rank_value(self, histogram: tuple, rank: int, index_path: str, lo: float, hi: float) -> float:
+        """Value of 0-based `rank` among the finite values of the index GeoTIFF at `index_path`.
+
+        `histogram` covers all of them over MEDIAN_RANGE. When `rank` falls in one of its outer
+        bins, the span between that end of MEDIAN_RANGE and the data's `lo`/`hi` is re-binned
+        from the file. Every value is counted again, so `rank` carries over unchanged.
+        """
+        b = histogram_bin(histogram, rank)
+        if 0 < b < histogram[0].size - 1 or histogram[1][b] == histogram[2][b]:
+            return histogram_value(histogram, rank)
+        span = (lo, MEDIAN_RANGE[0]) if b == 0 else (MEDIAN_RANGE[1], hi)
+        histogram = empty_histogram()
+        with rasterio.open(index_path) as src:
+            for _, window in src.block_windows(1):
+                histogram_kernel(src.read(1, window=window).ravel(), *span, *histogram)
+        return histogram_value(histogram, rank)
+
+    def preview_shape(self) -> tuple:
+        # Downsampled shape for the rendered PNG. Reads at this shape average the source pixels
+        # and let GDAL serve them from the file's overview pyramid when it has one.
+        scale = max(self.dataset.height, self.dataset.width) / PREVIEW_MAX_SIZE
+        if scale <= 1:
+            return (self.dataset.height, self.dataset.width)
+        return (max(1, int(self.dataset.height / scale)), max(1, int(self.dataset.width / scale)))
+
+    def save_result(
+        self,
+        index_image: np.ndarray,
+        output_path: Optional[str],
+        index_type: str,
+        vmin: Optional[float] = None,
+        vmax: Optional[float] = None
+    ) -> bytes:
+        """Render the index to PNG and return the encoded bytes; also written to `output_path` if given.
+
+        `vmin`/`vmax` bound the color stretch; when omitted they are taken from `index_image`.
+        """
         try:
-            # Create a figure
-            plt.figure(figsize=(10, 8))
+            finite = np.isfinite(index_image)
+            if vmin is None or vmax is None:
+                # Stretch the colormap over the finite value range, as imshow would
+                if finite.any():
+                    vmin = float(np.min(index_image, where=finite, initial=np.inf))
+                    vmax = float(np.max(index_image, where=finite, initial=-np.inf))
+                else:
+                    vmin = vmax = 0.0
+            scale = 256.0 / (vmax - vmin) if vmax > vmin else 0.0
             
-            # Create custom colormap for vegetation indices
-            colors = ['#d73027', '#f46d43', '#fdae61', '#fee08b', '#d9ef8b', '#a6d96a', '#66bd63', '#1a9850']
-            cmap = LinearSegmentedColormap.from_list('vegetation', colors)
+            # Colorize with a uint8 gather from the LUT; NaN pixels are made transparent.
+            # The LUT index is built in one reused buffer, skipping the non-finite pixels.
+            lut_index = np.zeros(index_image.shape, dtype=np.float32)
+            np.subtract(index_image, vmin, out=lut_index, where=finite)
+            np.multiply(lut_index, scale, out=lut_index)
+            np.clip(lut_index, 0, 255, out=lut_index)
+            rgba = _VEG_LUT[lut_index.astype(np.uint8)]
+            rgba[~finite, 3] = 0
+            image = Image.fromarray(rgba, "RGBA")
             
-            # Plot the index
-            plt.imshow(index_image, cmap=cmap)
-            plt.colorbar(label=index_type)
-            plt.title(f"{index_type} - {os.path.basename(self.filepath)}")
-            plt.axis('off')
+            # Compose the title, the index image and the colorbar on a white canvas
+            height, width = index_image.shape
+            bar_left = width + COLORBAR_PADDING
+            canvas = Image.new("RGB", (bar_left + COLORBAR_WIDTH + COLORBAR_LABEL_WIDTH, height + TITLE_HEIGHT), "white")
+            canvas.paste(image, (0, TITLE_HEIGHT), image)
+            canvas.paste(colorbar_strip(height), (bar_left, TITLE_HEIGHT))
+            draw = ImageDraw.Draw(canvas)
+            draw.text((0, 4), f"{index_type} - {os.path.basename(self.filepath)}", fill="black")
+            draw.text((bar_left + COLORBAR_WIDTH + 4, TITLE_HEIGHT), f"{vmax:.3g}", fill="black")
+            draw.text((bar_left + COLORBAR_WIDTH + 4, TITLE_HEIGHT + max(height - 12, 0)), f"{vmin:.3g}", fill="black")
             
-            # Save the plot
-            plt.savefig(output_path, dpi=300, bbox_inches='tight')
-            plt.close()
+            # zlib encoding dominates small requests, so it runs in the PNG process pool
+            png = png_executor().submit(encode_png, np.asarray(canvas)).result()
+            if output_path:
+                with open(output_path, "wb") as f:
+                    f.write(png)
             
-            return output_path
+            return png
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to save result: {str(e)}")
 
-    def calculate_statistics(self, index_image: np.ndarray) -> dict:
-        valid_pixels = index_image[~np.isnan(index_image) & ~np.isinf(index_image)]
-        if len(valid_pixels) > 0:
+    def calculate_statistics(self, summary: tuple) -> dict:
+        """Statistics from the full-resolution summary returned by write_index."""
+        count, lo, hi, total, total_sq, median = summary
+        if count > 0:
+            mean = total / count
             return {
-                "min": float(np.min(valid_pixels)),
-                "max": float(np.max(valid_pixels)),
-                "mean": float(np.mean(valid_pixels)),
-                "median": float(np.median(valid_pixels)),
-                "std": float(np.std(valid_pixels))
+                "min": float(lo),
+                "max": float(hi),
+                "mean": float(mean),
+                "median": median,
+                "std": float(np.sqrt(max(total_sq / count - mean * mean, 0.0)))
             }
         return {
             "error": "No valid pixels found in the result"
@@ -169,81 +506,105 @@ async def calculate_index(
         output_dir = "output"
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
+        await run_in_threadpool(prune_outputs)
         
-        # Create a temporary file directly in the output directory
-        temp_file_path = os.path.join(output_dir, f"{unique_prefix}_input.tif")
-        
-        # Read the uploaded file content
-        content = await file.read()
-        
-        # Write content to the temporary file
-        with open(temp_file_path, "wb") as f:
-            f.write(content)
+        temp_file_path = None
+        memfile = None
         
         # Process the file
         try:
-            # Initialize calculator
-            calculator = VegetationIndicesCalculator(temp_file_path)
-            
             # Calculate the requested index
-            if index_type.upper() == "NDVI":
-                result = calculator.calculate_ndvi(red_band, nir_band)
-            elif index_type.upper() == "EVI":
-                result = calculator.calculate_evi(red_band, nir_band, blue_band, G, C1, C2, L)
-            elif index_type.upper() == "SAVI":
-                result = calculator.calculate_savi(red_band, nir_band, L)
-            elif index_type.upper() == "NDWI":
-                result = calculator.calculate_ndwi(green_band=2, nir_band=nir_band)
-            else:
+            index_fns = {
+                "NDVI": lambda **kw: calculator.calculate_ndvi(red_band, nir_band, **kw),
+                "EVI": lambda **kw: calculator.calculate_evi(red_band, nir_band, blue_band, G, C1, C2, L, **kw),
+                "SAVI": lambda **kw: calculator.calculate_savi(red_band, nir_band, L, **kw),
+                "NDWI": lambda **kw: calculator.calculate_ndwi(green_band=2, nir_band=nir_band, **kw),
+            }
+            index_fn = index_fns.get(index_type.upper())
+            if index_fn is None:
                 raise HTTPException(
                     status_code=400,
                     detail=f"Unsupported index type: {index_type}. Supported types are: NDVI, EVI, SAVI, NDWI"
                 )
             
-            # Save the result
-            output_filename = f"{unique_prefix}_{index_type.lower()}.png"
-            output_path = os.path.join(output_dir, output_filename)
-            calculator.save_result(result, output_path, index_type)
-            
-            # Calculate statistics
-            stats = calculator.calculate_statistics(result)
+            # Hash the upload as it arrives; the digest keys the result cache
+            hasher = hashlib.blake2b()
+            if file.size is not None and file.size <= IN_MEMORY_MAX_BYTES:
+                # Small uploads are opened straight from memory, skipping the disk round-trip
+                memfile = MemoryFile()
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    hasher.update(chunk)
+                    memfile.write(chunk)
+            else:
+                # Create a temporary file directly in the output directory
+                temp_file_path = os.path.join(output_dir, f"{unique_prefix}_input.tif")
+                
+                # Copy the upload to the temporary file in chunks rather than holding it all in memory
+                with open(temp_file_path, "wb") as f:
+                    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                        hasher.update(chunk)
+                        await run_in_threadpool(f.write, chunk)
             
-            # Explicitly close the dataset
-            calculator.dataset.close()
-            calculator.dataset = None
+            cache_key = result_cache_key(hasher.digest(), index_type, {
+                "redBand": red_band, "nirBand": nir_band, "blueBand": blue_band,
+                "G": G, "C1": C1, "C2": C2, "L": L,
+            })
+            cached = await run_in_threadpool(get_cached_result, cache_key)
+            if cached is not None:
+                img_content, output_filename, geotiff_filename, stats = cached
+            else:
+                # Initialize calculator
+                if memfile is not None:
+                    calculator = VegetationIndicesCalculator(file.filename or "upload.tif", await run_in_threadpool(memfile.open))
+                else:
+                    calculator = await run_in_threadpool(VegetationIndicesCalculator, temp_file_path)
+                
+                geotiff_filename = f"{unique_prefix}_{index_type.lower()}.tif"
+                output_filename = f"{unique_prefix}_{index_type.lower()}.png"
+                output_path = os.path.join(output_dir, output_filename)
+                
+                def process():
+                    # Decoding, the index kernels and PNG encoding all block, so this runs in a worker thread
+                    # Stream the full-resolution index to a GeoTIFF one window at a time
+                    summary = calculator.write_index(index_fn, os.path.join(output_dir, geotiff_filename))
+                    
+                    # Render the PNG from a downsampled read; it is kept on disk for /download.
+                    # The color stretch uses the full-resolution min/max gathered while writing.
+                    preview = index_fn(out_shape=calculator.preview_shape())
+                    count, lo, hi = summary[:3]
+                    png = calculator.save_result(preview, output_path, index_type, float(lo) if count else None, float(hi) if count else None)
+                    
+                    stats = calculator.calculate_statistics(summary)
+                    
+                    return png, stats
+                
+                img_content, stats = await run_in_threadpool(process)
+                
+                # Explicitly close the dataset
+                calculator.dataset.close()
+                calculator.dataset = None
+                
+                await run_in_threadpool(store_cached_result, cache_key, img_content, output_filename, geotiff_filename, stats)
             
             # Record end time and calculate duration
             end_time = datetime.now()
             end_timestamp = end_time.isoformat()
             duration = (end_time - start_time).total_seconds()
             
-            # Clean up the temporary input file
-            try:
-                os.remove(temp_file_path)
-            except Exception:
-                pass  # Ignore errors when cleaning up
-            
             # Create metadata dictionary
             result_metadata = {
                 "index_type": index_type,
                 "start_time": start_timestamp,
                 "end_time": end_timestamp,
                 "processing_duration": duration,
+                "geotiff_filename": geotiff_filename,
+                "cached": cached is not None,
                 "statistics": stats
             }
             
-            # Read the generated image file
-            with open(output_path, "rb") as img_file:
-                img_content = img_file.read()
-            
-            # Create multipart response with metadata and image
+            # Stream the multipart response (metadata, then image) instead of concatenating it
             boundary = "boundary"
-            headers = {
-                "Content-Type": f"multipart/mixed; boundary={boundary}"
-            }
-            
-            # Format multipart content
-            content = (
+            head = (
                 f"--{boundary}\r\n"
                 f"Content-Type: application/json\r\n\r\n"
                 f"{json.dumps(result_metadata)}\r\n"
@@ -251,11 +612,15 @@ async def calculate_index(
                 f"Content-Type: image/png\r\n"
                 f"Content-Disposition: attachment; filename={output_filename}\r\n\r\n"
             ).encode()
+            tail = f"\r\n--{boundary}--".encode()
             
-            content += img_content
-            content += f"\r\n--{boundary}--".encode()
+            async def multipart_body():
+                yield head
+                for start in range(0, len(img_content), RESPONSE_CHUNK_SIZE):
+                    yield img_content[start:start + RESPONSE_CHUNK_SIZE]
+                yield tail
             
-            return Response(content=content, headers=headers)
+            return StreamingResponse(multipart_body(), media_type=f"multipart/mixed; boundary={boundary}")
             
         finally:
             # Make sure the calculator is closed
@@ -264,10 +629,23 @@ async def calculate_index(
                     calculator.dataset.close()
                 except:
                     pass
+            if memfile is not None:
+                memfile.close()
+            # Clean up the temporary input file
+            if temp_file_path:
+                try:
+                    os.remove(temp_file_path)
+                except Exception:
+                    pass  # Ignore errors when cleaning up
                     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.on_event("shutdown")
+def shutdown_png_executor():
+    if _png_executor is not None:
+        _png_executor.shutdown()
+
 @app.get("/download/{filename}")
 async def download_result(filename: str):
     file_path = os.path.join("output", filename)
@@ -1,12 +1,59 @@
 import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 import numpy as np
+import numexpr as ne
 import matplotlib.pyplot as plt
-from matplotlib.colors import LinearSegmentedColormap
+from matplotlib.cm import ScalarMappable
+from matplotlib.colors import LinearSegmentedColormap, Normalize
 import rasterio
 from rasterio.plot import show
+from rasterio.enums import Resampling
+from rasterio.features import geometry_mask
+from rasterio.transform import Affine
+from rasterio.windows import Window
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from PIL import Image
+from image_utils import ndvi_kernel, evi_kernel, savi_kernel, ndwi_kernel, stats_kernel, kernel_dtype
+
+
+# GDAL settings for the session unless already set in the environment: a 1 GB block cache
+# (in MB), so blocks of the open image stay in memory between calculations, and compressed
+# tiles decoded on all cores
+os.environ.setdefault('GDAL_CACHEMAX', '1024')
+os.environ.setdefault('GDAL_NUM_THREADS', 'ALL_CPUS')
+
+# Rows per window when the image is striped rather than tiled
+TILE_ROWS = 512
+# Longest side, in pixels, of the RGB composite shown on screen
+PREVIEW_MAX_SIZE = 1024
+# Bands kept in memory between index calculations, and the size limit for caching them
+BAND_CACHE_SIZE = 4
+BAND_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+# RGB lookup table for PNG export, one entry per 8-bit display level
+EXPORT_LUT = (plt.get_cmap('RdYlGn')(np.arange(256))[:, :3] * 255).astype(np.uint8)
+# GeoTIFF creation options for saved results: internally tiled, LZW with the floating-point
+# predictor, and BigTIFF whenever the output could pass 4 GB
+RESULT_PROFILE = {
+    'driver': 'GTiff',
+    'dtype': 'float32',
+    'count': 1,
+    'tiled': True,
+    'blockxsize': 512,
+    'blockysize': 512,
+    'compress': 'lzw',
+    'predictor': 3,
+    'BIGTIFF': 'IF_SAFER',
+}
+# Pixels sampled (evenly strided) for the histogram window
+HISTOGRAM_MAX_SAMPLES = 1_000_000
+# Red-to-green colormap used for every index view
+VEGETATION_CMAP = LinearSegmentedColormap.from_list(
+    'vegetation', ['#d73027', '#f46d43', '#fdae61', '#fee08b', '#d9ef8b', '#a6d96a', '#66bd63', '#1a9850'])
 
 
 class VegetationIndicesCalculator:
@@ -31,6 +78,25 @@ class VegetationIndicesCalculator:
         self.dataset = None
         self.index_image = None
         self.roi_coords = []
+        # Recently used full-resolution bands, keyed by band number; reset in load_image
+        self._band_cache = OrderedDict()
+        # Worker threads for windowed reads, each with its own reader of the current image.
+        # Readers stay open across calculations and are closed in load_image.
+        self._read_executor = None
+        self._tile_local = threading.local()
+        self._tile_readers = []
+        self._tile_readers_lock = threading.Lock()
+        # Images and colorbar drawn on the figure, kept so later results update them in place
+        self._rgb_im = None
+        # Stretched uint8 RGB preview of the loaded image and the (path, mtime, bands) it shows
+        self._rgb_preview = None
+        self._rgb_preview_key = None
+        self._idx_im = None
+        self._cbar = None
+        # ROI marker artist, the background it is blitted over, and the click handler id
+        self._roi_pts = None
+        self._roi_bg = None
+        self._roi_click_cid = None
         
         # Create the main frame
         main_frame = ttk.Frame(master)
@@ -160,6 +226,8 @@ class VegetationIndicesCalculator:
     
     def load_image(self):
         try:
+            self._band_cache.clear()
+            self._close_readers()
             self.dataset = rasterio.open(self.filepath.get())
             band_count = self.dataset.count
             
@@ -179,17 +247,19 @@ class VegetationIndicesCalculator:
             if 2 > band_count:
                 rgb_bands[1] = 1  # Fallback to Red if Green isn’t available
             
-            rgb = np.dstack([self.dataset.read(i) for i in rgb_bands])
-            
-            # Normalize for display
-            rgb_norm = np.zeros_like(rgb, dtype=np.float32)
-            for i in range(3):
-                band = rgb[:,:,i]
-                min_val = np.percentile(band, 2)
-                max_val = np.percentile(band, 98)
-                rgb_norm[:,:,i] = np.clip((band - min_val) / (max_val - min_val), 0, 1)
+            # Reloading the same, unmodified file with the same bands reuses the stretched preview
+            preview_key = (self.filepath.get(), os.stat(self.filepath.get()).st_mtime_ns, tuple(rgb_bands))
+            if preview_key != self._rgb_preview_key:
+                rgb = self._read_rgb_preview(rgb_bands)
+                
+                # Normalize for display, kept as 8-bit RGB: a quarter of the float32 memory
+                rgb_norm = self._normalize_rgb(rgb)
+                rgb_norm *= 255
+                self._rgb_preview = rgb_norm.astype(np.uint8)
+                self._rgb_preview_key = preview_key
             
-            self.ax1.imshow(rgb_norm)
+            # Drawn over the full-resolution pixel extent so zooming stays in step with the index view
+            self._rgb_im = self.ax1.imshow(self._rgb_preview, extent=self._pixel_extent())
             self.ax1.set_title("RGB Composite")
             self.ax1.axis('off')
             
@@ -199,6 +269,116 @@ class VegetationIndicesCalculator:
             messagebox.showerror("Error", f"Failed to load image: {str(e)}")
             self.status_var.set("Error loading image.")
 
+    def _index_windows(self):
+        # Follow the file's internal tiling; striped files are processed TILE_ROWS rows at a time
+        block_height, block_width = self.dataset.block_shapes[0]
+        if block_width < self.dataset.width:
+            for _, window in self.dataset.block_windows(1):
+                yield window
+            return
+        rows = max(block_height, TILE_ROWS)
+        for row in range(0, self.dataset.height, rows):
+            yield Window(0, row, self.dataset.width, min(rows, self.dataset.height - row))
+
+    def _get_bands(self, bands):
+        """Full-resolution bands (in kernel_dtype) from the band cache, reading any missing ones.
+
+        Returns None when the bands are too large to cache; callers then read by window.
+        """
+        dtype = kernel_dtype(self.dataset.dtypes[0])
+        band_bytes = self.dataset.width * self.dataset.height * dtype.itemsize
+        if band_bytes * len(set(bands)) > BAND_CACHE_MAX_BYTES:
+            return None
+        missing = [b for b in dict.fromkeys(bands) if b not in self._band_cache]
+        if missing:
+            for band, data in zip(missing, self.dataset.read(missing, out_dtype=dtype)):
+                self._band_cache[band] = data
+        for band in bands:
+            self._band_cache.move_to_end(band)
+        while len(self._band_cache) > max(BAND_CACHE_SIZE, len(set(bands))):
+            self._band_cache.popitem(last=False)
+        return [self._band_cache[b] for b in bands]
+
+    def _compute_index_tiled(self, func, bands):
+        # Switching index mostly reuses bands that were just read, so serve them from the cache
+        out = np.empty((self.dataset.height, self.dataset.width), dtype=np.float32)
+        cached = self._get_bands(bands)
+        if cached is not None:
+            func(*cached, out)
+            return out
+        
+        # Too large to cache: evaluate func(*band_tiles, out_tile) window by window straight
+        # into the result, so only a few tiles of band data are held at a time.
+        # Worker threads read and decode upcoming windows (GDAL releases the GIL) while this
+        # thread runs the already-parallel kernel on the current one. Dataset handles are not
+        # thread-safe, so each worker has its own reader.
+        dtype = kernel_dtype(self.dataset.dtypes[0])
+        
+        def read(window):
+            # One read decodes each block once for all bands, kept in the band dtype
+            # when the kernels have a variant for it
+            return self._tile_reader().read(bands, window=window, out_dtype=dtype)
+        
+        workers = os.cpu_count() or 1
+        if self._read_executor is None:
+            self._read_executor = ThreadPoolExecutor(max_workers=workers)
+        windows = self._index_windows()
+        # Keep a bounded number of reads in flight, in window order
+        pending = deque((w, self._read_executor.submit(read, w)) for w in islice(windows, 2 * workers))
+        try:
+            while pending:
+                window, future = pending.popleft()
+                tiles = future.result()
+                upcoming = next(windows, None)
+                if upcoming is not None:
+                    pending.append((upcoming, self._read_executor.submit(read, upcoming)))
+                func(*tiles, out[window.toslices()])
+        finally:
+            # On error, let reads already submitted finish before the caller moves on
+            for _, future in pending:
+                future.cancel()
+            for _, future in pending:
+                if not future.cancelled():
+                    future.exception()
+        return out
+
+    def _tile_reader(self):
+        # Reader of the current image owned by the calling worker thread. Keeping it open
+        # across calculations keeps its blocks in GDAL's cache.
+        if not hasattr(self._tile_local, 'dataset'):
+            self._tile_local.dataset = rasterio.open(self.dataset.name)
+            with self._tile_readers_lock:
+                self._tile_readers.append(self._tile_local.dataset)
+        return self._tile_local.dataset
+
+    def _close_readers(self):
+        # Close the current image and all worker readers of it before another is loaded
+        with self._tile_readers_lock:
+            for reader in self._tile_readers:
+                reader.close()
+            self._tile_readers = []
+        self._tile_local = threading.local()
+        if self.dataset is not None:
+            self.dataset.close()
+            self.dataset = None
+
+    def _read_rgb_preview(self, rgb_bands):
+        # Screen-sized (H, W, 3) float32 composite: a decimated read lets GDAL decode a matching
+        # overview level instead of the full-resolution bands, converting as it decodes
+        scale = max(1.0, max(self.dataset.height, self.dataset.width) / PREVIEW_MAX_SIZE)
+        target = (max(1, int(self.dataset.height / scale)), max(1, int(self.dataset.width / scale)))
+        rgb = self.dataset.read(rgb_bands, out_shape=(len(rgb_bands),) + target, resampling=Resampling.average, out_dtype=np.float32)
+        return np.moveaxis(rgb, 0, -1)
+
+    def _normalize_rgb(self, rgb):
+        # 2-98 percentile stretch per channel: one percentile call for all three channels,
+        # then a broadcast normalize, in place when `rgb` is already float32
+        lo, hi = np.percentile(rgb.reshape(-1, 3), [2, 98], axis=0)
+        rgb_norm = rgb.astype(np.float32, copy=False)
+        rgb_norm -= lo
+        rgb_norm /= hi - lo
+        return np.clip(rgb_norm, 0, 1, out=rgb_norm)
+
     def calculate_ndvi(self):
         try:
             red_band = int(self.band_red.get())
@@ -210,14 +390,11 @@ class VegetationIndicesCalculator:
                 messagebox.showerror("Error", f"The selected file only has {self.dataset.count} bands, but band {max_band} was requested.")
                 return None
             
-            red = self.dataset.read(red_band).astype(np.float32)
-            nir = self.dataset.read(nir_band).astype(np.float32)
-            
-            # Avoid division by zero
-            denominator = nir + red
-            ndvi = np.where(denominator > 0, (nir - red) / denominator, 0)
+            def ndvi(red, nir, out):
+                # Fused Numba kernel; pixels with a zero denominator are 0
+                ndvi_kernel(red, nir, out)
             
-            return ndvi
+            return self._compute_index_tiled(ndvi, [red_band, nir_band])
         except Exception as e:
             messagebox.showerror("Error", f"Failed to calculate NDVI: {str(e)}")
             return None
@@ -234,21 +411,17 @@ class VegetationIndicesCalculator:
                 messagebox.showerror("Error", f"The selected file only has {self.dataset.count} bands, but band {max_band} was requested.")
                 return None
             
-            red = self.dataset.read(red_band).astype(np.float32)
-            nir = self.dataset.read(nir_band).astype(np.float32)
-            blue = self.dataset.read(blue_band).astype(np.float32)
-            
             # Get EVI parameters
             G = self.evi_g.get()
             C1 = self.evi_C1.get()
             C2 = self.evi_C2.get()
             L = self.evi_L.get()
             
-            # EVI formula: G * (NIR - RED) / (NIR + C1 * RED - C2 * BLUE + L)
-            denominator = nir + C1 * red - C2 * blue + L
-            evi = np.where(denominator > 0, G * (nir - red) / denominator, 0)
+            def evi(red, nir, blue, out):
+                # EVI formula: G * (NIR - RED) / (NIR + C1 * RED - C2 * BLUE + L)
+                evi_kernel(red, nir, blue, G, C1, C2, L, out)
             
-            return evi
+            return self._compute_index_tiled(evi, [red_band, nir_band, blue_band])
         except Exception as e:
             messagebox.showerror("Error", f"Failed to calculate EVI: {str(e)}")
             return None
@@ -259,20 +432,20 @@ class VegetationIndicesCalculator:
         nir_band = int(self.band_nir.get())
         L = 0.5  # Soil brightness correction factor
         
-        red = self.dataset.read(red_band).astype(np.float32)
-        nir = self.dataset.read(nir_band).astype(np.float32)
+        def savi(red, nir, out):
+            savi_kernel(red, nir, L, out)
         
-        return ((nir - red) / (nir + red + L)) * (1 + L)
+        return self._compute_index_tiled(savi, [red_band, nir_band])
 
     def calculate_ndwi(self):
         # NDWI (Normalized Difference Water Index)
         green_band = 2  # Assuming band 2 is green
         nir_band = int(self.band_nir.get())
         
-        green = self.dataset.read(green_band).astype(np.float32)
-        nir = self.dataset.read(nir_band).astype(np.float32)
+        def ndwi(green, nir, out):
+            ndwi_kernel(green, nir, out)
         
-        return (green - nir) / (green + nir)
+        return self._compute_index_tiled(ndwi, [green_band, nir_band])
 
     def show_histogram(self):
         if self.index_image is None:
@@ -284,8 +457,12 @@ class VegetationIndicesCalculator:
         hist_window.title(f"{self.current_index.get()} Histogram")
         
         fig, ax = plt.subplots(figsize=(8, 6))
-        valid_data = self.index_image[~np.isnan(self.index_image) & ~np.isinf(self.index_image)]
-        ax.hist(valid_data.flatten(), bins=100)
+        # Bin an evenly strided sample rather than every pixel; the shape of the distribution is
+        # unchanged, and counts are scaled back up so the axis still reads in pixels
+        step = max(1, self.index_image.size // HISTOGRAM_MAX_SAMPLES)
+        sample = self.index_image.ravel()[::step]
+        counts, edges = np.histogram(sample[np.isfinite(sample)], bins=100)
+        ax.bar(edges[:-1], counts * step, width=np.diff(edges), align='edge')
         ax.set_title(f"{self.current_index.get()} Distribution")
         ax.set_xlabel("Value")
         ax.set_ylabel("Frequency")
@@ -295,33 +472,47 @@ class VegetationIndicesCalculator:
 
     def enable_roi_selection(self):
         self.roi_coords = []
-        self.canvas.mpl_connect('button_press_event', self.on_click)
+        if self._roi_pts is not None:
+            self._roi_pts.remove()
+        # ROI markers are an animated artist: each click restores the saved background and
+        # blits just the markers instead of re-rendering the index image
+        self._roi_pts, = self.ax2.plot([], [], 'ro', animated=True)
+        if self._roi_click_cid is None:
+            self._roi_click_cid = self.canvas.mpl_connect('button_press_event', self.on_click)
+            self.canvas.mpl_connect('draw_event', self.on_draw)
+        self.canvas.draw()
         self.status_var.set("Click to define ROI points. Double-click to complete.")
         
+    def on_draw(self, event):
+        # A full redraw (zoom, resize, new result) invalidates the saved background
+        if self._roi_pts is not None:
+            self._roi_bg = self.canvas.copy_from_bbox(self.ax2.bbox)
+            self.ax2.draw_artist(self._roi_pts)
+            
     def on_click(self, event):
         if event.dblclick:
             self.complete_roi()
             return
             
-        if event.inaxes == self.ax2:
+        if event.inaxes == self.ax2 and self._roi_pts is not None:
             self.roi_coords.append((event.xdata, event.ydata))
-            self.ax2.plot(event.xdata, event.ydata, 'ro')
-            self.canvas.draw()
+            self._roi_pts.set_data(*zip(*self.roi_coords))
+            self.canvas.restore_region(self._roi_bg)
+            self.ax2.draw_artist(self._roi_pts)
+            self.canvas.blit(self.ax2.bbox)
             
     def complete_roi(self):
         if len(self.roi_coords) < 3:
             messagebox.showwarning("Warning", "Need at least 3 points for a valid ROI.")
             return
             
-        # Create a polygon from the points
-        from matplotlib.path import Path
-        roi_path = Path(self.roi_coords)
+        # Create a polygon from the points. Clicks are in imshow coordinates, where pixel
+        # centers sit on integers; rasterizing puts them at +0.5, hence the shift.
+        ring = [(x + 0.5, y + 0.5) for x, y in self.roi_coords]
+        roi_polygon = {"type": "Polygon", "coordinates": [ring + ring[:1]]}
         
-        # Create a mask for the ROI
-        y, x = np.mgrid[:self.index_image.shape[0], :self.index_image.shape[1]]
-        points = np.vstack((x.ravel(), y.ravel())).T
-        mask = roi_path.contains_points(points)
-        mask = mask.reshape(self.index_image.shape)
+        # Rasterize the ROI straight to a boolean mask (True inside)
+        mask = geometry_mask([roi_polygon], out_shape=self.index_image.shape, transform=Affine.identity(), invert=True)
         
         # Calculate statistics for the ROI
         roi_values = self.index_image[mask]
@@ -356,13 +547,13 @@ class VegetationIndicesCalculator:
                 formula = formula_entry.get()
                 bands = [int(b.strip()) for b in bands_entry.get().split(",")]
                 
-                # Load the bands
-                band_data = {}
-                for i, band_num in enumerate(bands, 1):
-                    band_data[f"band{i}"] = self.dataset.read(band_num).astype(np.float32)
+                # Load the bands with a single read
+                stack = self.dataset.read(bands, out_dtype=np.float32)
+                band_data = {f"band{i}": band for i, band in enumerate(stack, 1)}
                     
-                # Evaluate the formula
-                result = eval(formula, {"__builtins__": {}}, band_data)
+                # Evaluate the formula in one fused, multithreaded pass. numexpr only accepts
+                # arithmetic on the named bands and its own functions, and rejects anything else
+                result = ne.evaluate(formula, local_dict=band_data, global_dict={})
                 
                 # Display the result
                 self.index_image = result
@@ -386,14 +577,13 @@ class VegetationIndicesCalculator:
         
         if save_path:
             try:
-                plt.figure(figsize=(10, 8))
-                plt.imshow(self.index_image, cmap='RdYlGn', vmin=self.min_display.get(), vmax=self.max_display.get())
-                plt.colorbar(label=self.current_index.get())
-                plt.title(f"{self.current_index.get()} - {os.path.basename(self.filepath.get())}")
-                plt.axis('off')
-                plt.tight_layout()
-                plt.savefig(save_path, dpi=300)
-                plt.close()
+                # Map the index straight through the colormap LUT and encode the pixels at
+                # native resolution; NaN/Inf pixels are left transparent
+                levels, valid = self._quantize_index(self.min_display.get(), self.max_display.get())
+                rgba = np.empty(levels.shape + (4,), dtype=np.uint8)
+                rgba[..., :3] = EXPORT_LUT[levels]
+                rgba[..., 3] = 255 if valid is None else np.where(valid, 255, 0)
+                Image.fromarray(rgba).save(save_path)
                 messagebox.showinfo("Success", f"Image exported to {save_path}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to export: {str(e)}")
@@ -442,65 +632,65 @@ class VegetationIndicesCalculator:
         if self.index_image is not None:
             self.display_result(index_type)
     
+    def _pixel_extent(self):
+        # imshow's default extent for a full-resolution band, also used for the decimated RGB preview
+        return (-0.5, self.dataset.width - 0.5, self.dataset.height - 0.5, -0.5)
+
+    def _quantize_index(self, min_val, max_val):
+        """The index image as uint8 colormap levels, binned over [min_val, max_val].
+
+        Also returns the mask of finite pixels, or None when every pixel is finite.
+        """
+        scale = 256 / (max_val - min_val) if max_val != min_val else 0.0
+        levels = (self.index_image - min_val) * scale
+        np.clip(levels, 0, 255, out=levels)
+        valid = np.isfinite(self.index_image)
+        if valid.all():
+            valid = None
+        else:
+            levels[~valid] = 0
+        return levels.astype(np.uint8), valid
+
     def display_result(self, index_type):
         min_val = self.min_display.get()
         max_val = self.max_display.get()
         
-        # Clear the entire figure and recreate the subplots with proper sizing
-        plt.close(self.fig)
-        self.fig = plt.figure(figsize=(10, 6))
-        self.ax1 = self.fig.add_subplot(1, 2, 1)
-        self.ax2 = self.fig.add_subplot(1, 2, 2)
-        
-        # Redisplay the RGB composite
-        if self.dataset is not None:
-            rgb_bands = [int(self.band_red.get()), 2, int(self.band_blue.get())]
-            
-            # Adjust if Green band (2) exceeds band count
-            if 2 > self.dataset.count:
-                rgb_bands[1] = 1
-                
-            rgb = np.dstack([self.dataset.read(i) for i in rgb_bands])
-            
-            # Normalize for display
-            rgb_norm = np.zeros_like(rgb, dtype=np.float32)
-            for i in range(3):
-                band = rgb[:,:,i]
-                min_val_rgb = np.percentile(band, 2)
-                max_val_rgb = np.percentile(band, 98)
-                rgb_norm[:,:,i] = np.clip((band - min_val_rgb) / (max_val_rgb - min_val_rgb), 0, 1)
-            
-            self.ax1.imshow(rgb_norm)
-            self.ax1.set_title("RGB Composite")
-            self.ax1.axis('off')
-        
-        # Create a custom colormap for vegetation indices
-        colors = ['#d73027', '#f46d43', '#fdae61', '#fee08b', '#d9ef8b', '#a6d96a', '#66bd63', '#1a9850']
-        cmap = LinearSegmentedColormap.from_list('vegetation', colors)
-        
-        # Display the index image
-        im = self.ax2.imshow(self.index_image, cmap=cmap, vmin=min_val, vmax=max_val)
+        # The colormap only has 256 entries, so hand matplotlib 8-bit levels rather than the
+        # float32 index: a quarter of the memory, and no float normalization when it redraws.
+        # Non-finite pixels are masked so they stay transparent.
+        levels, valid = self._quantize_index(min_val, max_val)
+        display = levels if valid is None else np.ma.masked_array(levels, mask=~valid)
+        
+        if self._idx_im is None:
+            # First result: create the image and its colorbar once
+            self._idx_im = self.ax2.imshow(display, cmap=VEGETATION_CMAP, vmin=0, vmax=255)
+            self.ax2.axis('off')
+            # The colorbar is scaled in index values, not the levels the image is drawn with
+            scale = ScalarMappable(Normalize(min_val, max_val), VEGETATION_CMAP)
+            self._cbar = self.fig.colorbar(scale, ax=self.ax2, orientation='vertical', shrink=0.8, pad=0.02)
+            self.fig.tight_layout()
+        else:
+            # Later results reuse the axes; the RGB composite is unchanged since load_image
+            self._idx_im.set_data(display)
+            self._cbar.mappable.set_clim(min_val, max_val)
+            self._idx_im.set_extent(self._pixel_extent())
+            # ROI markers belong to the previous result
+            for line in list(self.ax2.lines):
+                line.remove()
+            self._roi_pts = None
+            self.roi_coords = []
         self.ax2.set_title(f"{index_type} Result")
-        self.ax2.axis('off')
-        
-        # Add colorbar with consistent positioning
-        cbar = self.fig.colorbar(im, ax=self.ax2, orientation='vertical', shrink=0.8, pad=0.02)
-        cbar.set_label(index_type)
+        self._cbar.set_label(index_type)
         
-        # Apply tight layout to ensure proper spacing
-        self.fig.tight_layout()
-        
-        # Update the canvas with the new figure
-        self.canvas.figure = self.fig
-        self.canvas.draw()
+        self.canvas.draw_idle()
         
-        # Calculate statistics
-        valid_pixels = self.index_image[~np.isnan(self.index_image) & ~np.isinf(self.index_image)]
-        if len(valid_pixels) > 0:
-            min_idx = np.min(valid_pixels)
-            max_idx = np.max(valid_pixels)
-            mean_idx = np.mean(valid_pixels)
-            median_idx = np.median(valid_pixels)
+        # Calculate statistics: min/max/mean in one pass that skips NaN/Inf inline; a compacted
+        # copy is only made for the median, and only if there are non-finite pixels
+        values = self.index_image.ravel()
+        count, min_idx, max_idx, total, _ = stats_kernel(values)
+        if count > 0:
+            mean_idx = total / count
+            median_idx = np.median(values if count == values.size else values[np.isfinite(values)])
             self.status_var.set(f"{index_type} calculated. Min: {min_idx:.3f}, Max: {max_idx:.3f}, Mean: {mean_idx:.3f}, Median: {median_idx:.3f}")
         else:
             self.status_var.set(f"{index_type} calculated but contains no valid pixels.")
@@ -520,7 +710,11 @@ class VegetationIndicesCalculator:
             if not save_path:
                 return
             
-            # Save the result as GeoTIFF
+            # Save the result as a georeferenced GeoTIFF on the source image's grid
+            profile = dict(RESULT_PROFILE, height=self.dataset.height, width=self.dataset.width,
+                           crs=self.dataset.crs, transform=self.dataset.transform, nodata=np.nan)
+            with rasterio.open(save_path, 'w', **profile) as dst:
+                dst.write(self.index_image, 1)
             self.status_var.set(f"Result saved to {os.path.basename(save_path)}")
             messagebox.showinfo("Success", f"Result saved successfully to:\n{save_path}")
         except Exception as e:
@@ -0,0 +1,185 @@
+import numpy as np
+import numba
+from numba import njit, prange
+
+# The API runs the parallel kernels from several threadpool workers at once, which the
+# default workqueue threading layer does not support (it aborts the process). Require a
+# thread-safe layer (TBB, or OpenMP) before the first kernel launch in _warm_up.
+numba.config.THREADING_LAYER = "threadsafe"
+
+# fastmath without the no-NaN/no-Inf assumptions, so the NaN written for a zero
+# denominator in SAVI/NDWI survives optimization
+FASTMATH = {"nsz", "arcp", "contract", "afn", "reassoc"}
+
+
+def aligned_empty(shape, dtype=np.float32, align: int = 64) -> np.ndarray:
+    """np.empty, but with the data starting on an `align`-byte (cache line) boundary.
+
+    NumPy only guarantees 16-byte alignment; 64 keeps AVX2/AVX-512 loads and stores
+    aligned in the kernels below and in any ufunc run over the result.
+    """
+    dtype = np.dtype(dtype)
+    count = int(np.prod(shape))
+    buffer = np.empty(count * dtype.itemsize + align, dtype=np.uint8)
+    offset = -buffer.ctypes.data % align
+    return buffer[offset:offset + count * dtype.itemsize].view(dtype).reshape(shape)
+
+
+# NDVI/EVI for one pixel, inlined into both the parallel kernels and the serial tile kernels
+# below so each formula is defined once.
+@njit(inline="always")
+def _ndvi_pixel(red, nir):
+    r = np.float32(red)
+    n = np.float32(nir)
+    d = n + r
+    return (n - r) / d if d > 0 else np.float32(0.0)
+
+
+@njit(inline="always")
+def _evi_pixel(red, nir, blue, G, C1, C2, L):
+    r = np.float32(red)
+    n = np.float32(nir)
+    d = n + C1 * r - C2 * np.float32(blue) + L
+    return G * (n - r) / d if d > 0 else 0.0
+
+
+# Fused per-pixel index kernels: one pass over the bands, no temporaries.
+# Each writes into a caller-allocated float32 `out` array with the same shape as the bands.
+# Bands are taken in their native dtype (typically uint16) and widened per pixel, so the
+# full rasters are never cast to float; uint16 sums and differences are exact in float32.
+@njit(parallel=True, fastmath=FASTMATH, cache=True)
+def ndvi_kernel(red, nir, out):
+    for i in prange(red.shape[0]):
+        for j in range(red.shape[1]):
+            out[i, j] = _ndvi_pixel(red[i, j], nir[i, j])
+
+
+@njit(parallel=True, fastmath=FASTMATH, cache=True)
+def evi_kernel(red, nir, blue, G, C1, C2, L, out):
+    for i in prange(red.shape[0]):
+        for j in range(red.shape[1]):
+            out[i, j] = _evi_pixel(red[i, j], nir[i, j], blue[i, j], G, C1, C2, L)
+
+
+@njit(parallel=True, fastmath=FASTMATH, cache=True)
+def savi_kernel(red, nir, L, out):
+    for i in prange(red.shape[0]):
+        for j in range(red.shape[1]):
+            r = np.float32(red[i, j])
+            n = np.float32(nir[i, j])
+            d = n + r + L
+            out[i, j] = (n - r) / d * (1 + L) if d != 0 else np.nan
+
+
+@njit(parallel=True, fastmath=FASTMATH, cache=True)
+def ndwi_kernel(green, nir, out):
+    for i in prange(green.shape[0]):
+        for j in range(green.shape[1]):
+            g = np.float32(green[i, j])
+            n = np.float32(nir[i, j])
+            d = g + n
+            out[i, j] = (g - n) / d if d != 0 else np.nan
+
+
+# Serial variants for callers that parallelize over tiles themselves (REST_API_version1's
+# process_blocks): they release the GIL so tiles run concurrently in a thread pool.
+@njit(nogil=True, fastmath=FASTMATH, cache=True)
+def ndvi_tile_kernel(red, nir, out):
+    for i in range(red.shape[0]):
+        for j in range(red.shape[1]):
+            out[i, j] = _ndvi_pixel(red[i, j], nir[i, j])
+
+
+@njit(nogil=True, fastmath=FASTMATH, cache=True)
+def evi_tile_kernel(red, nir, blue, G, C1, C2, L, out):
+    for i in range(red.shape[0]):
+        for j in range(red.shape[1]):
+            out[i, j] = _evi_pixel(red[i, j], nir[i, j], blue[i, j], G, C1, C2, L)
+
+
+# Single-pass statistics over a 1-D array: per-thread partial reductions, combined by Numba.
+# Non-finite values are skipped inline; sums are accumulated in float64.
+@njit(parallel=True, fastmath=FASTMATH, cache=True)
+def stats_kernel(values):
+    count = 0
+    total = 0.0
+    total_sq = 0.0
+    lo = np.inf
+    hi = -np.inf
+    for i in prange(values.size):
+        v = np.float64(values[i])
+        if np.isfinite(v):
+            count += 1
+            total += v
+            total_sq += v * v
+            lo = min(lo, v)
+            hi = max(hi, v)
+    return count, lo, hi, total, total_sq
+
+
+# Fixed-range histogram for a streaming median, accumulated over successive arrays.
+# `counts`, `mins` and `maxs` have nbins + 2 entries: bins 1..nbins split [lo, hi], bin 0
+# collects values below `lo` and the last bin values above `hi`. mins/maxs track the value
+# range seen in each bin (start them at +inf/-inf). Non-finite values are skipped.
+@njit(nogil=True, fastmath=FASTMATH, cache=True)
+def histogram_kernel(values, lo, hi, counts, mins, maxs):
+    nbins = counts.size - 2
+    scale = nbins / (hi - lo)
+    for i in range(values.size):
+        v = np.float64(values[i])
+        if not np.isfinite(v):
+            continue
+        if v < lo:
+            b = 0
+        elif v > hi:
+            b = nbins + 1
+        else:
+            b = min(int((v - lo) * scale), nbins - 1) + 1
+        counts[b] += 1
+        mins[b] = min(mins[b], v)
+        maxs[b] = max(maxs[b], v)
+
+
+# Band dtypes the kernels are specialized for up front. Numba compiles (and caches on disk)
+# one machine-code variant per input dtype, so there is no dtype branching inside the loops.
+KERNEL_DTYPES = (np.uint8, np.uint16, np.int16, np.float32)
+
+
+def kernel_dtype(dtype) -> np.dtype:
+    """The dtype to read bands as for the kernels.
+
+    Bands already in one of KERNEL_DTYPES are read as they are, so uint8/uint16 imagery moves
+    a half or a quarter of the bytes float32 would. Anything else is converted to float32 on
+    read rather than compiling a new kernel variant on first use.
+    """
+    dtype = np.dtype(dtype)
+    return dtype if dtype in KERNEL_DTYPES else np.dtype(np.float32)
+
+
+def _warm_up():
+    # Compile (or load from the on-disk cache) at import time instead of on the first request
+    out = np.empty((4, 4), dtype=np.float32)
+    for dtype in KERNEL_DTYPES:
+        band = np.ones((4, 4), dtype=dtype)
+        ndvi_kernel(band, band, out)
+        evi_kernel(band, band, band, 2.5, 6.0, 7.5, 1.0, out)
+        savi_kernel(band, band, 0.5, out)
+        ndwi_kernel(band, band, out)
+    # Also writing into a column slice of a larger array, as when a tile's result goes
+    # straight into the full-size output
+    tile_out = np.empty((4, 8), dtype=np.float32)[:, :4]
+    for dtype in KERNEL_DTYPES:
+        band = np.ones((4, 4), dtype=dtype)
+        ndvi_kernel(band, band, tile_out)
+        evi_kernel(band, band, band, 2.5, 6.0, 7.5, 1.0, tile_out)
+        savi_kernel(band, band, 0.5, tile_out)
+        ndwi_kernel(band, band, tile_out)
+    # The tile kernels are only fed float32 bands
+    ndvi_tile_kernel(out, out, out)
+    evi_tile_kernel(out, out, out, 2.5, 6.0, 7.5, 1.0, out)
+    stats_kernel(out.ravel())
+    counts = np.zeros(6, dtype=np.int64)
+    histogram_kernel(out.ravel(), -1.0, 1.0, counts, np.full(6, np.inf), np.full(6, -np.inf))
+
+
+_warm_up()
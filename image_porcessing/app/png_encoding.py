@@ -0,0 +1,12 @@
+import io
+import numpy as np
+from PIL import Image
+
+
+# Runs in the PNG worker processes, which import only this module: keep it free of
+# the app's heavier dependencies (FastAPI, rasterio, matplotlib, the Numba kernels)
+def encode_png(pixels: np.ndarray) -> bytes:
+    # Fast, light compression: the PNG is produced per request
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, "PNG", compress_level=1)
+    return buffer.getvalue()